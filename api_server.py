@@ -1,9 +1,16 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, g, request, jsonify, send_file, send_from_directory, Response
 from flask_cors import CORS
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
 import sys
 import os
 import json
+import gzip
+import zlib
 import logging
+import hashlib
+import hmac
+from datetime import datetime, timezone
 from pathlib import Path
 import time
 
@@ -18,18 +25,409 @@ sys.path.insert(0, str(Path(__file__).parent))
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
-from xray.storage import save_execution
+from xray.storage import (
+    save_execution, load_execution, load_execution_raw, execution_cache_stats, detect_compression,
+    query_executions, catalog_version, save_executions, evaluations_directory, evaluation_file,
+    execution_exists
+)
+from xray.streaming import line_byte_range, load_evaluations
+from xray.aggregation import aggregate_evaluations, summarize_evaluation_file, summary_cache_stats
+from xray.events import get_event_bus
+from xray.metrics import HTTP_REQUEST_SECONDS, render_metrics
+from xray.ingest import IngestConflictError, IngestError, IngestWriter, decode_payload, parse_records
+from xray.regression import detect_regressions
+from xray.jobs import JobQueue, QueueFullError, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
 from demo.demo_app import demo_workflow_orchestrator
 
+EVALUATION_FILTERS = {"all": None, "passed": True, "failed": False}
+MAX_EVALUATION_PAGE_SIZE = 1000
+MAX_LISTING_LIMIT = 500
+MAX_DEMO_CANDIDATES = int(os.getenv('XRAY_DEMO_MAX_CANDIDATES', '1000'))
+DEMO_DATASETS = ("mock", "synthetic")
+EVENT_QUEUE_SIZE = int(os.getenv('XRAY_EVENT_QUEUE_SIZE', '1000'))
+EVENT_KEEPALIVE_SECONDS = 15
+FILTER_ENGINE = os.getenv('XRAY_FILTER_ENGINE', 'batch')
+FILTER_WORKERS = int(os.getenv('XRAY_FILTER_WORKERS', '1'))
+FILTER_EXECUTOR = os.getenv('XRAY_FILTER_EXECUTOR', 'thread')
+
+# Serverless functions are frozen once they respond and job polls can reach another
+# instance, so on Vercel demo runs complete inside the request instead of the job queue
+DEMO_RUNS_INLINE = os.getenv('DEPLOYMENT_MODE', 'local') == 'vercel'
+demo_jobs = JobQueue(
+    max_workers=int(os.getenv('XRAY_DEMO_WORKERS', '2')),
+    max_queue=int(os.getenv('XRAY_DEMO_QUEUE_SIZE', '8')),
+    name="demo-run"
+)
+
+ingest_writer = IngestWriter(
+    save_executions,
+    evaluations_directory(),
+    max_pending=int(os.getenv('XRAY_INGEST_QUEUE_SIZE', '50000')),
+    batch_size=int(os.getenv('XRAY_INGEST_BATCH_SIZE', '1000')),
+    exists=execution_exists,
+    allow_overwrite=os.getenv('XRAY_INGEST_ALLOW_OVERWRITE', '').lower() in ('1', 'true', 'yes')
+)
+INGEST_MAX_BYTES = int(os.getenv('XRAY_INGEST_MAX_BYTES', str(64 * 1024 * 1024)))
+INGEST_TOKEN = os.getenv('XRAY_INGEST_TOKEN')
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(route=route, method=request.method,
+                                    status=response.status_code).observe(time.perf_counter() - started)
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 
 @app.route('/')
 def index():
     return send_from_directory('.', 'dashboard.html')
 
 
+# Stored compression -> HTTP content-coding ("deflate" is zlib-wrapped per RFC 9110)
+CONTENT_CODINGS = {"gzip": "gzip", "zlib": "deflate"}
+
+
+def _compressed_json_response(content: bytes, compression):
+    """Serve stored JSON bytes as-is, letting the client decompress when it can"""
+    if compression is None:
+        return Response(content, mimetype='application/json')
+    
+    content_coding = CONTENT_CODINGS[compression]
+    if content_coding in request.accept_encodings:
+        response = Response(content, mimetype='application/json')
+        response.headers['Content-Encoding'] = content_coding
+    else:
+        body = gzip.decompress(content) if compression == "gzip" else zlib.decompress(content)
+        response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+GZIP_MIN_BYTES = 1024
+DATA_MIMETYPES = {'.json': 'application/json', '.jsonl': 'application/x-ndjson'}
+
+
+def _read_chunks(filepath: str, start: int = 0, end=None):
+    """Yield a file's bytes [start, end) in fixed-size chunks.
+    
+    The file is only opened once iteration starts, so responses that are never
+    streamed (304s, unsatisfiable ranges) hold no file handle.
+    """
+    with open(filepath, 'rb') as handle:
+        handle.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            chunk = handle.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _inflate_chunks(chunks, compression):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if compression == "gzip" else zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    yield decompressor.flush()
+
+
+def _streamed_file_response(filepath: str, mimetype: str, chunks, content_coding=None, variant: str = ""):
+    stat = os.stat(filepath)
+    response = Response(chunks, mimetype=mimetype)
+    if content_coding:
+        response.headers['Content-Encoding'] = content_coding
+    response.last_modified = stat.st_mtime
+    response.set_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}{variant}")
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
+
+
+def _line_range_response(filepath: str, range_header: str, mimetype: str):
+    """Serve `Range: lines=first-last` (0-based, inclusive) from the file's line-offset index"""
+    try:
+        first, _, last = range_header[len('lines='):].partition('-')
+        first = int(first)
+        last = int(last) if last.strip() else None
+        if first < 0 or (last is not None and last < first):
+            raise ValueError(range_header)
+    except ValueError:
+        return jsonify({"success": False, "error": "Invalid lines range"}), 416
+    
+    byte_range = line_byte_range(filepath, first, None if last is None else last + 1)
+    if byte_range is None:
+        # No index for this file: ignore the range and send the whole file
+        return send_file(filepath, mimetype=mimetype, conditional=True)
+    
+    start, end, indexed_lines = byte_range
+    if first >= indexed_lines:
+        response = Response(status=416)
+        response.headers['Content-Range'] = f"lines */{indexed_lines}"
+        return response
+    
+    chunks = _read_chunks(filepath, start, end)
+    if 'gzip' in request.accept_encodings:
+        response = Response(_gzip_chunks(chunks), status=206, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(chunks, status=206, mimetype=mimetype)
+        response.content_length = end - start
+    last_line = indexed_lines - 1 if last is None else min(last, indexed_lines - 1)
+    response.headers['Content-Range'] = f"lines {first}-{last_line}/{indexed_lines}"
+    response.vary.add('Accept-Encoding')
+    return response
+
+
 @app.route('/xray_data/<path:filename>')
 def serve_xray_data(filename):
-    return send_from_directory('xray_data', filename)
+    """Serve stored data files.
+    
+    JSON and JSONL are streamed in chunks and gzip-compressed when the client
+    accepts it; byte ranges are served as-is, and evaluation JSONL files also
+    accept `Range: lines=first-last` through their line-offset index.
+    """
+    filepath = safe_join('xray_data', filename)
+    suffix = os.path.splitext(filename)[1]
+    if not filepath or not os.path.isfile(filepath) or suffix not in DATA_MIMETYPES:
+        return send_from_directory('xray_data', filename)
+    
+    filepath = os.path.abspath(filepath)
+    mimetype = DATA_MIMETYPES[suffix]
+    compression = None
+    if suffix == '.json':
+        with open(filepath, 'rb') as handle:
+            compression = detect_compression(handle.read(2))
+    
+    if compression is not None:
+        content_coding = CONTENT_CODINGS[compression]
+        if content_coding in request.accept_encodings:
+            response = send_file(filepath, mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = content_coding
+            response.vary.add('Accept-Encoding')
+            return response
+        return _streamed_file_response(filepath, mimetype, _inflate_chunks(_read_chunks(filepath), compression),
+                                       variant="-identity")
+    
+    range_header = request.headers.get('Range', '')
+    if suffix == '.jsonl' and range_header.startswith('lines='):
+        return _line_range_response(filepath, range_header, mimetype)
+    
+    if 'gzip' in request.accept_encodings and not range_header and os.path.getsize(filepath) >= GZIP_MIN_BYTES:
+        return _streamed_file_response(filepath, mimetype, _gzip_chunks(_read_chunks(filepath)),
+                                       content_coding='gzip', variant="-gzip")
+    
+    response = send_file(filepath, mimetype=mimetype, conditional=True)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.route('/api/executions')
+def list_executions_endpoint():
+    """Cursor-paginated execution listing with ETag/Last-Modified revalidation."""
+    limit = request.args.get('limit', 50, type=int)
+    if limit < 1 or limit > MAX_LISTING_LIMIT:
+        return jsonify({
+            "success": False,
+            "error": f"limit must be between 1 and {MAX_LISTING_LIMIT}"
+        }), 400
+    
+    # When the backend has a cheap change token, answer revalidations
+    # without listing anything.
+    version = catalog_version()
+    etag = last_modified = None
+    if version is not None:
+        token, modified = version
+        etag = hashlib.sha1(f"{token}?{request.query_string.decode()}".encode()).hexdigest()[:20]
+        last_modified = datetime.fromtimestamp(modified, tz=timezone.utc)
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+    
+    try:
+        result = query_executions(
+            name=request.args.get('name'),
+            status=request.args.get('status'),
+            tag=request.args.get('tag'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            cursor=request.args.get('cursor'),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    response = jsonify({
+        "success": True,
+        "executions": result["executions"],
+        "next_cursor": result["next_cursor"],
+        "limit": limit
+    })
+    if etag is not None:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+    else:
+        response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.route('/api/executions/<execution_id>')
+def get_execution(execution_id):
+    try:
+        content, compression = load_execution_raw(execution_id)
+        return _compressed_json_response(content, compression)
+    except FileNotFoundError:
+        return jsonify({
+            "success": False,
+            "error": f"Execution {execution_id} not found"
+        }), 404
+
+
+@app.route('/api/executions/<execution_id>/steps/<step_id>/evaluations')
+def get_step_evaluations(execution_id, step_id):
+    """Return one page of a step's evaluations, read server-side from its stream file."""
+    page = request.args.get('page', 0, type=int)
+    page_size = request.args.get('page_size', 50, type=int)
+    eval_filter = request.args.get('filter', 'all')
+    
+    if page < 0:
+        return jsonify({"success": False, "error": "page must be non-negative"}), 400
+    if page_size < 1 or page_size > MAX_EVALUATION_PAGE_SIZE:
+        return jsonify({
+            "success": False,
+            "error": f"page_size must be between 1 and {MAX_EVALUATION_PAGE_SIZE}"
+        }), 400
+    if eval_filter not in EVALUATION_FILTERS:
+        return jsonify({
+            "success": False,
+            "error": f"filter must be one of: {', '.join(EVALUATION_FILTERS)}"
+        }), 400
+    qualified = EVALUATION_FILTERS[eval_filter]
+    
+    try:
+        execution = load_execution(execution_id)
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": f"Execution {execution_id} not found"}), 404
+    
+    step = next((s for s in execution.get('steps', []) if s.get('id') == step_id), None)
+    if step is None:
+        return jsonify({"success": False, "error": f"Step {step_id} not found"}), 404
+    
+    evaluations = step.get('evaluations') or []
+    if isinstance(evaluations, dict) and evaluations.get('mode') == 'stream':
+        totals = {"all": evaluations.get('total', 0), "passed": evaluations.get('passed', 0),
+                  "failed": evaluations.get('failed', 0)}
+        filepath = evaluation_file(step_id, evaluations)
+        if filepath is None:
+            return jsonify({"success": False, "error": f"Evaluation file for step {step_id} not found"}), 404
+        items = load_evaluations(filepath, page, page_size, qualified)
+    else:
+        matching = [e for e in evaluations if qualified is None or bool(e.get('qualified')) == qualified]
+        totals = {"all": len(evaluations), "passed": sum(1 for e in evaluations if e.get('qualified')),
+                  "failed": sum(1 for e in evaluations if not e.get('qualified'))}
+        items = matching[page * page_size:(page + 1) * page_size]
+    
+    total = totals[eval_filter]
+    return jsonify({
+        "success": True,
+        "execution_id": execution_id,
+        "step_id": step_id,
+        "filter": eval_filter,
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "total_pages": (total + page_size - 1) // page_size,
+        "counts": totals,
+        "evaluations": items
+    })
+
+
+@app.route('/api/executions/<execution_id>/steps/<step_id>/evaluations/summary')
+def get_step_evaluation_summary(execution_id, step_id):
+    """Failure breakdown of a step's evaluations, aggregated server-side and cached per file."""
+    try:
+        execution = load_execution(execution_id)
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": f"Execution {execution_id} not found"}), 404
+    
+    step = next((s for s in execution.get('steps', []) if s.get('id') == step_id), None)
+    if step is None:
+        return jsonify({"success": False, "error": f"Step {step_id} not found"}), 404
+    
+    evaluations = step.get('evaluations') or []
+    if isinstance(evaluations, dict) and evaluations.get('mode') == 'stream':
+        filepath = evaluation_file(step_id, evaluations)
+        summary = summarize_evaluation_file(filepath) if filepath is not None else None
+        if summary is None:
+            return jsonify({"success": False, "error": f"Evaluation file for step {step_id} not found"}), 404
+    else:
+        summary = aggregate_evaluations(evaluations)
+    
+    return jsonify({
+        "success": True,
+        "execution_id": execution_id,
+        "step_id": step_id,
+        "summary": summary
+    })
+
+
+@app.route('/api/regressions')
+def get_regressions():
+    """Step duration regressions of an execution against earlier runs with the same name."""
+    name = request.args.get('name')
+    if not name:
+        return jsonify({"success": False, "error": "name is required"}), 400
+    
+    try:
+        report = detect_regressions(
+            name,
+            execution_id=request.args.get('execution_id'),
+            window=request.args.get('window', 20, type=int),
+            threshold_pct=request.args.get('threshold_pct', 25.0, type=float),
+            min_baseline=request.args.get('min_baseline', 5, type=int)
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    
+    if report is None:
+        return jsonify({"success": False, "error": f"No matching executions named {name}"}), 404
+    return jsonify(dict(report, success=True))
+
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    return jsonify({
+        "evaluation_summary_cache": summary_cache_stats(),
+        "execution_cache": execution_cache_stats()
+    })
 
 
 @app.route('/api/demo/run', methods=['POST'])
@@ -45,10 +443,36 @@ def run_demo():
                 "success": False,
                 "error": "num_candidates must be an integer"
             }), 400
-        if num_candidates < 1 or num_candidates > 1000:
+        if num_candidates < 1 or num_candidates > MAX_DEMO_CANDIDATES:
+            return jsonify({
+                "success": False,
+                "error": f"num_candidates must be between 1 and {MAX_DEMO_CANDIDATES}"
+            }), 400
+        
+        # Validate dataset and synthetic catalog parameters
+        dataset = params.get('dataset', 'mock')
+        if dataset not in DEMO_DATASETS:
+            return jsonify({
+                "success": False,
+                "error": f"dataset must be one of: {', '.join(DEMO_DATASETS)}"
+            }), 400
+        seed = params.get('seed', 0)
+        if not isinstance(seed, int):
+            return jsonify({
+                "success": False,
+                "error": "seed must be an integer"
+            }), 400
+        pass_rate = params.get('pass_rate', 0.6)
+        if not isinstance(pass_rate, (int, float)) or not 0 <= pass_rate <= 1:
+            return jsonify({
+                "success": False,
+                "error": "pass_rate must be a number between 0 and 1"
+            }), 400
+        price_spread = params.get('price_spread', 0.35)
+        if not isinstance(price_spread, (int, float)) or price_spread <= 0:
             return jsonify({
                 "success": False,
-                "error": "num_candidates must be between 1 and 1000"
+                "error": "price_spread must be a positive number"
             }), 400
         
         # Validate min_price_multiplier
@@ -103,30 +527,59 @@ def run_demo():
                 "error": "min_reviews must be non-negative"
             }), 400
         
-        logger.info(f"Running demo with params: num_candidates={num_candidates}, "
+        logger.info(f"{'Running' if DEMO_RUNS_INLINE else 'Queueing'} demo run with params: "
+                   f"num_candidates={num_candidates}, dataset={dataset}, "
                    f"price_mult={min_price_mult}-{max_price_mult}, "
                    f"min_rating={min_rating}, min_reviews={min_reviews}")
-        
-        # Run the workflow orchestrator
-        execution_data = demo_workflow_orchestrator({
+        demo_params = {
             'num_candidates': num_candidates,
             'min_price_multiplier': min_price_mult,
             'max_price_multiplier': max_price_mult,
             'min_rating': min_rating,
-            'min_reviews': min_reviews
-        })
+            'min_reviews': min_reviews,
+            'dataset': dataset,
+            'seed': seed,
+            'pass_rate': pass_rate,
+            'price_spread': price_spread,
+            'filter_engine': FILTER_ENGINE,
+            'filter_workers': FILTER_WORKERS,
+            'filter_executor': FILTER_EXECUTOR
+        }
         
-        # Save execution
-        filepath = save_execution(execution_data, filename="demo_execution.json")
+        if DEMO_RUNS_INLINE:
+            # Same body as /api/jobs/<job_id>/result for a finished job
+            execution_data = demo_workflow_orchestrator(demo_params)
+            filepath = save_execution(execution_data)
+            logger.info(f"Demo completed successfully. Execution ID: {execution_data['id']}")
+            return jsonify({
+                "success": True,
+                "status": JOB_SUCCEEDED,
+                "execution_id": execution_data['id'],
+                "execution_data": execution_data,
+                "filepath": filepath
+            })
         
-        logger.info(f"Demo completed successfully. Execution ID: {execution_data['id']}")
+        # Queue the workflow; callers poll /api/jobs/<job_id> for the outcome
+        try:
+            job_id = demo_jobs.submit(_run_demo_job, demo_params)
+        except QueueFullError as e:
+            logger.warning(f"Rejecting demo run: {e}")
+            response = jsonify({
+                "success": False,
+                "error": "Too many demo runs in progress. Please retry shortly."
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
         
-        return jsonify({
+        response = jsonify({
             "success": True,
-            "execution_id": execution_data['id'],
-            "execution_data": execution_data,
-            "filepath": filepath
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/jobs/{job_id}",
+            "result_url": f"/api/jobs/{job_id}/result"
         })
+        response.headers['Location'] = f"/api/jobs/{job_id}"
+        return response, 202
         
     except ValueError as e:
         logger.warning(f"Validation error in run_demo: {e}")
@@ -142,5 +595,131 @@ def run_demo():
         }), 500
 
 
+def _run_demo_job(params: dict) -> dict:
+    execution_data = demo_workflow_orchestrator(params)
+    filepath = save_execution(execution_data)
+    logger.info(f"Demo completed successfully. Execution ID: {execution_data['id']}")
+    return {"execution_id": execution_data['id'], "filepath": filepath}
+
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = demo_jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Job {job_id} not found"}), 404
+    
+    job_data = job.to_dict()
+    if job.status == JOB_FAILED and not isinstance(job.error, ValueError):
+        job_data["error"] = {"type": "InternalError",
+                             "message": "An internal error occurred. Please check the server logs."}
+    if job.status == JOB_SUCCEEDED:
+        job_data["execution_id"] = job.result["execution_id"]
+    return jsonify({"success": True, "job": job_data})
+
+
+@app.route('/api/jobs/<job_id>/result')
+def get_job_result(job_id):
+    job = demo_jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Job {job_id} not found"}), 404
+    
+    if job.status in (JOB_QUEUED, JOB_RUNNING):
+        return jsonify({"success": False, "status": job.status, "error": "Job has not finished yet"}), 202
+    
+    if job.status == JOB_FAILED:
+        if isinstance(job.error, ValueError):
+            return jsonify({"success": False, "status": job.status, "error": str(job.error)}), 400
+        return jsonify({
+            "success": False,
+            "status": job.status,
+            "error": "An internal error occurred. Please check the server logs."
+        }), 500
+    
+    try:
+        execution_data = load_execution(job.result["execution_id"])
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "Execution for this job is no longer stored"}), 410
+    
+    return jsonify({
+        "success": True,
+        "status": job.status,
+        "execution_id": job.result["execution_id"],
+        "execution_data": execution_data,
+        "filepath": job.result["filepath"]
+    })
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest():
+    """Accept a gzip NDJSON batch of executions and evaluation chunks for the bulk writer.
+    
+    The endpoint is disabled unless XRAY_INGEST_TOKEN is set.
+    """
+    if not INGEST_TOKEN:
+        return jsonify({"success": False, "error": "Ingest is disabled; set XRAY_INGEST_TOKEN to enable it"}), 404
+    authorization = request.headers.get('Authorization', '').encode('utf-8')
+    if not hmac.compare_digest(authorization, f"Bearer {INGEST_TOKEN}".encode('utf-8')):
+        return jsonify({"success": False, "error": "Invalid or missing ingest token"}), 401
+    if request.content_length is not None and request.content_length > INGEST_MAX_BYTES:
+        return jsonify({"success": False, "error": f"Payload exceeds {INGEST_MAX_BYTES} bytes"}), 413
+    
+    try:
+        # Content-Encoding is handled here rather than by the WSGI layer, so read the raw body
+        records = parse_records(decode_payload(request.get_data(cache=False), INGEST_MAX_BYTES))
+        ingest_writer.submit(records)
+    except IngestConflictError as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+    except IngestError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except QueueFullError as e:
+        response = jsonify({"success": False, "error": str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    return jsonify({
+        "success": True,
+        "accepted": len(records),
+        "pending": ingest_writer.stats()["pending"]
+    }), 202
+
+
+@app.route('/api/ingest/stats')
+def get_ingest_stats():
+    return jsonify({"success": True, "ingest": ingest_writer.stats()})
+
+
+@app.route('/api/events')
+def stream_events():
+    """Server-Sent Events feed of execution, step and evaluation progress events"""
+    execution_id = request.args.get('execution_id')
+    subscription = get_event_bus().subscribe(max_queue=EVENT_QUEUE_SIZE)
+    
+    def generate():
+        reported_drops = 0
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = subscription.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                
+                if subscription.dropped > reported_drops:
+                    dropped = subscription.dropped - reported_drops
+                    reported_drops = subscription.dropped
+                    yield f"event: dropped\ndata: {json.dumps({'type': 'dropped', 'count': dropped})}\n\n"
+                
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if execution_id and event.get("execution_id") != execution_id:
+                    continue
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            subscription.close()
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
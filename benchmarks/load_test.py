@@ -0,0 +1,290 @@
+"""Load test for the X-Ray API server.
+
+Starts api_server.app in-process on a free port (with its data in a
+temporary directory) and drives closed-loop concurrent workloads against it:
+
+    demo   POST /api/demo/run with rotating num_candidates (mock or synthetic
+           candidates), waiting up to --job-timeout for each job
+    list   GET /api/executions, following one next_cursor
+    evals  GET paged evaluations of previously stored demo runs
+
+Results (throughput, error counts, latency percentiles) are printed as JSON.
+With --baseline, throughput is compared against a previous result file and the
+exit code is non-zero if any workload fell by more than --tolerance.
+
+    python benchmarks/load_test.py --duration 10 --concurrency 8 --output result.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from xray.jobs import JOB_FAILED, JOB_SUCCEEDED  # noqa: E402
+from xray.stats import percentile  # noqa: E402
+
+WORKLOADS = ("demo", "list", "evals")
+PERCENTILES = (50, 90, 95, 99)
+JOB_TIMEOUT = 120.0
+
+
+def start_server(data_dir: str):
+    """Import api_server with data_dir as working directory and serve it from a background thread"""
+    os.chdir(data_dir)
+    import api_server
+    from werkzeug.serving import make_server
+    
+    server = make_server("127.0.0.1", 0, api_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.port}"
+
+
+class Workload:
+    """Runs one request function from N threads for a fixed duration and collects latencies"""
+    
+    def __init__(self, name: str, request_fn: Callable[[requests.Session, random.Random], Optional[str]]):
+        self.name = name
+        self.request_fn = request_fn
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+    
+    def run(self, concurrency: int, duration: float, seed: int) -> Dict:
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=self._worker, args=(deadline, random.Random(seed + i)))
+                   for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return self._report(elapsed)
+    
+    def _worker(self, deadline: float, rng: random.Random):
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                outcome = self.request_fn(session, rng)
+            except requests.RequestException:
+                outcome = "error"
+            latency = time.perf_counter() - started
+            with self._lock:
+                if outcome == "rejected":
+                    self.rejected += 1
+                elif outcome == "error":
+                    self.errors += 1
+                else:
+                    self.latencies.append(latency)
+            if outcome == "rejected":
+                time.sleep(0.05)
+        session.close()
+    
+    def _report(self, elapsed: float) -> Dict:
+        latencies = sorted(self.latencies)
+        latency_ms = {f"p{pct}": round(percentile(latencies, pct / 100) * 1000, 3) if latencies else 0.0
+                      for pct in PERCENTILES}
+        latency_ms["mean"] = round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0
+        latency_ms["max"] = round(latencies[-1] * 1000, 3) if latencies else 0.0
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "duration_s": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": latency_ms
+        }
+
+
+def run_demo(session: requests.Session, base_url: str, num_candidates: int, demo_params: Dict,
+             job_timeout: float = JOB_TIMEOUT) -> str:
+    """One demo run: "ok", "rejected" or "error" (including jobs not finished within job_timeout)"""
+    response = session.post(f"{base_url}/api/demo/run", json={"num_candidates": num_candidates, **demo_params})
+    if response.status_code == 503:
+        return "rejected"
+    if response.status_code == 200:
+        # Servers with DEPLOYMENT_MODE=vercel run the demo inside the request
+        return "ok" if response.json().get("status") == JOB_SUCCEEDED else "error"
+    if response.status_code != 202:
+        return "error"
+    
+    job_id = response.json()["job_id"]
+    deadline = time.perf_counter() + job_timeout
+    while time.perf_counter() < deadline:
+        response = session.get(f"{base_url}/api/jobs/{job_id}")
+        if response.status_code != 200:
+            return "error"
+        status = response.json().get("job", {}).get("status")
+        if status == JOB_SUCCEEDED:
+            return "ok"
+        if status == JOB_FAILED:
+            return "error"
+        time.sleep(0.01)
+    return "error"
+
+
+def seed_executions(base_url: str, count: int, num_candidates: int, demo_params: Dict,
+                    job_timeout: float = JOB_TIMEOUT) -> List[Dict]:
+    """Run demo pipelines up front so the paging workload has streamed steps to read"""
+    session = requests.Session()
+    targets = []
+    for _ in range(count):
+        if run_demo(session, base_url, num_candidates, demo_params, job_timeout) != "ok":
+            continue
+    for summary in session.get(f"{base_url}/api/executions", params={"limit": count}).json()["executions"]:
+        execution = session.get(f"{base_url}/api/executions/{summary['id']}").json()
+        for step in execution["steps"]:
+            evaluations = step.get("evaluations")
+            if isinstance(evaluations, dict) and evaluations.get("mode") == "stream" and evaluations.get("total"):
+                targets.append({"execution_id": execution["id"], "step_id": step["id"],
+                                "total": evaluations["total"]})
+    session.close()
+    return targets
+
+
+def build_workloads(base_url: str, names: List[str], candidate_sizes: List[int], demo_params: Dict,
+                    page_size: int, eval_targets: List[Dict], job_timeout: float = JOB_TIMEOUT) -> List[Workload]:
+    def demo(session, rng):
+        return run_demo(session, base_url, rng.choice(candidate_sizes), demo_params, job_timeout)
+    
+    def listing(session, rng):
+        response = session.get(f"{base_url}/api/executions", params={"limit": 50})
+        if response.status_code != 200:
+            return "error"
+        next_cursor = response.json().get("next_cursor")
+        if next_cursor:
+            response = session.get(f"{base_url}/api/executions", params={"limit": 50, "cursor": next_cursor})
+        return "ok" if response.status_code == 200 else "error"
+    
+    def evals(session, rng):
+        target = rng.choice(eval_targets)
+        pages = max(1, (target["total"] + page_size - 1) // page_size)
+        response = session.get(
+            f"{base_url}/api/executions/{target['execution_id']}/steps/{target['step_id']}/evaluations",
+            params={"page": rng.randrange(pages), "page_size": page_size,
+                    "filter": rng.choice(("all", "passed", "failed"))}
+        )
+        return "ok" if response.status_code == 200 else "error"
+    
+    available = {"demo": demo, "list": listing, "evals": evals}
+    return [Workload(name, available[name]) for name in names]
+
+
+def compare_to_baseline(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    failures = []
+    for name, report in result["workloads"].items():
+        previous = baseline.get("workloads", {}).get(name)
+        if not previous or not previous.get("throughput_rps"):
+            continue
+        floor = previous["throughput_rps"] * (1 - tolerance)
+        if report["throughput_rps"] < floor:
+            failures.append(f"{name}: {report['throughput_rps']} req/s is below {floor:.2f} "
+                            f"(baseline {previous['throughput_rps']})")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the X-Ray API server")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS),
+                        help=f"comma-separated subset of {', '.join(WORKLOADS)}")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per workload")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients per workload")
+    parser.add_argument("--num-candidates", default="50,200,1000",
+                        help="comma-separated num_candidates values for demo runs")
+    parser.add_argument("--dataset", choices=("mock", "synthetic"), default="mock",
+                        help="demo candidates: the hand-written mock results or a generated catalog")
+    parser.add_argument("--pass-rate", type=float, default=0.6, help="filter pass rate of the synthetic dataset")
+    parser.add_argument("--page-size", type=int, default=50, help="evaluation page size")
+    parser.add_argument("--seed-runs", type=int, default=5, help="demo runs stored before paging")
+    parser.add_argument("--job-timeout", type=float, default=JOB_TIMEOUT,
+                        help="seconds to wait for a demo job before counting it as an error")
+    parser.add_argument("--url", help="target an already running server instead of starting one")
+    parser.add_argument("--data-dir", help="working directory for the in-process server (default: temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON result to this file as well as stdout")
+    parser.add_argument("--baseline", help="previous result file to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop vs baseline")
+    parser.add_argument("--verbose", action="store_true", help="keep server request logging")
+    args = parser.parse_args(argv)
+    
+    names = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = set(names) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+    candidate_sizes = [int(value) for value in args.num_candidates.split(",")]
+    demo_params = {"dataset": args.dataset, "seed": args.seed, "pass_rate": args.pass_rate}
+    # The in-process server changes directory, so resolve file arguments first
+    output_path = Path(args.output).resolve() if args.output else None
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+    
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        data_dir = args.data_dir or tempfile.mkdtemp(prefix="xray-load-")
+        os.environ.setdefault("XRAY_DEMO_MAX_CANDIDATES", str(max(1000, *candidate_sizes)))
+        server, base_url = start_server(data_dir)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    
+    eval_targets = []
+    if "evals" in names:
+        eval_targets = seed_executions(base_url, args.seed_runs, max(candidate_sizes), demo_params,
+                                       args.job_timeout)
+        if not eval_targets:
+            parser.error("no streamed evaluations available for the evals workload")
+    
+    workloads = build_workloads(base_url, names, candidate_sizes, demo_params, args.page_size, eval_targets,
+                                args.job_timeout)
+    result = {
+        "config": {
+            "workloads": names,
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "num_candidates": candidate_sizes,
+            "demo": demo_params,
+            "page_size": args.page_size,
+            "target": args.url or "in-process"
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "workloads": {}
+    }
+    for index, workload in enumerate(workloads):
+        result["workloads"][workload.name] = workload.run(args.concurrency, args.duration, args.seed + index * 1000)
+    
+    if server is not None:
+        server.shutdown()
+    
+    output = json.dumps(result, indent=2)
+    print(output)
+    if output_path:
+        output_path.write_text(output + "\n")
+    
+    if baseline_path:
+        failures = compare_to_baseline(result, json.loads(baseline_path.read_text()), args.tolerance)
+        for failure in failures:
+            print(f"Throughput regression: {failure}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
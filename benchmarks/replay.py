@@ -0,0 +1,64 @@
+"""Replay recorded auto-steps against the current code.
+
+Loads stored executions (from ./xray_data or the configured backend), resolves
+each auto-step's callable from the step registry and calls it with the
+recorded args/kwargs. Reports latency per step and output diffs against the
+recorded output as JSON.
+
+Callables are registered either by importing modules that call
+xray.replay.register_step, or with --step name=module:function:
+
+    python benchmarks/replay.py --step keyword_generation=demo.demo_app:generate_keywords \\
+        --name competitor_product_selection --iterations 50
+"""
+import argparse
+import importlib
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded X-Ray steps")
+    parser.add_argument("--execution", action="append", dest="executions",
+                        help="execution id to replay (repeatable; default: most recent executions)")
+    parser.add_argument("--name", help="only replay executions of this pipeline name")
+    parser.add_argument("--limit", type=int, default=10, help="number of recent executions to replay")
+    parser.add_argument("--iterations", type=int, default=10, help="calls per recorded step")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed calls before measuring")
+    parser.add_argument("--only", help="comma-separated step names to replay")
+    parser.add_argument("--module", action="append", default=[],
+                        help="module to import so its register_step calls run (repeatable)")
+    parser.add_argument("--step", action="append", default=[],
+                        help="register a callable as name=module:function (repeatable)")
+    parser.add_argument("--output", help="write the JSON result to this file as well as stdout")
+    args = parser.parse_args(argv)
+    
+    sys.path.insert(0, str(REPO_ROOT))
+    from xray.replay import registry, replay
+    
+    for module in args.module:
+        importlib.import_module(module)
+    for spec in args.step:
+        name, _, path = spec.partition("=")
+        if not path:
+            parser.error(f"--step expects name=module:function, got {spec}")
+        registry.register_path(name, path)
+    if not registry.names():
+        parser.error("no step callables registered; use --module or --step")
+    
+    steps = [name.strip() for name in args.only.split(",")] if args.only else None
+    result = replay(args.executions, name=args.name, limit=args.limit, iterations=args.iterations,
+                    steps=steps, warmup=args.warmup)
+    
+    output = json.dumps(result, indent=2, default=str)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
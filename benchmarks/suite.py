@@ -0,0 +1,331 @@
+"""Offline benchmark suite for the X-Ray library.
+
+Runs in a temporary working directory with no server or network and measures:
+
+    step.context / step.callable   per-step overhead of XRayExecution.step in both forms
+    stream.write.buffer_<n>        EvaluationStream.write cost per evaluation at several buffer sizes
+    execution.to_dict/save.<n>     serialization and LocalStorage.save cost by step count
+    list_executions.<n>            listing latency with n stored executions (cold and warm catalog)
+    load_from_file.<page>          evaluation page reads near the start and end of a large stream
+
+Each benchmark reports the best (min), median and noise of the time per
+operation over several repeats; noise is how far the median sits above the
+best run. Next to every benchmark a fixed pure-Python workload is timed as
+calibration_us, so shared or throttled machines can be told apart from slower
+code. Results are printed as JSON. --save-baseline stores them; --baseline
+compares best runs, scaled by the calibration ratio, against a stored file and
+exits with 1 when a benchmark is slower than its allowance: --threshold,
+widened to NOISE_FACTOR times the noise recorded in the baseline for benchmarks
+that are noisier than that, and to FILESYSTEM_ALLOWANCE for filesystem-bound
+ones. Baselines are still best recorded on a quiet machine, and regenerated
+when the reference machine changes.
+
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --quick --only stream,step
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+NOISE_FACTOR = 2.0
+# Saves and cold listings are dominated by filesystem latency, which varies far
+# more between runs than within one, so their noise_pct understates it
+FILESYSTEM_ALLOWANCE = 1.5
+
+
+def _calibration_seconds() -> float:
+    """Best of five runs of a fixed pure-Python workload, as a machine speed reference"""
+    document = {"id": "calibration", "steps": [{"name": f"step_{i}", "values": list(range(20))} for i in range(20)]}
+    samples = []
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(20):
+            json.loads(json.dumps(document))
+            sorted(range(2000), key=lambda value: -value)
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def _summarize(samples: List[float], number: int, calibration: float) -> Dict:
+    """Seconds per call from each repeat, reported in microseconds"""
+    best = min(samples)
+    median = statistics.median(samples)
+    return {
+        "median_us": round(median * 1e6, 3),
+        "min_us": round(best * 1e6, 3),
+        "noise_pct": round((median / best - 1) * 100, 1) if best else 0.0,
+        "calibration_us": round(calibration * 1e6, 3),
+        "number": number,
+        "repeat": len(samples)
+    }
+
+
+def _measure(fn: Callable[[], object], number: int, repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict:
+    """Time fn() `number` times per repeat and report seconds per call as microseconds"""
+    calibration = _calibration_seconds()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return _summarize(samples, number, min(calibration, _calibration_seconds()))
+
+
+def _evaluations(count: int) -> List[Dict]:
+    from demo.demo_app import _evaluate_product_with_params
+    from demo.mock_data import REFERENCE_PRODUCT
+    from demo.synthetic import SyntheticCatalog
+    
+    return [_evaluate_product_with_params(product, REFERENCE_PRODUCT, 0.5, 2.0, 3.8, 100)
+            for product in SyntheticCatalog(count, seed=1)]
+
+
+def _execution_data(steps: int):
+    from xray import XRay
+    
+    with XRay.start("benchmark", tags={"benchmark": True}) as xray:
+        for i in range(steps):
+            with xray.step(f"step_{i}", step_type="filter", reasoning="Benchmark step") as step:
+                step.set_input(index=i, values=list(range(10)))
+                step.set_output({"kept": i % 7, "dropped": 10 - i % 7})
+                step.set_metadata(iteration=i)
+    return xray
+
+
+def bench_step(quick: bool) -> Dict[str, Dict]:
+    from xray import XRay
+    
+    number = 2000 if quick else 20000
+    results = {}
+    
+    xray = XRay.start("benchmark")
+    
+    def context_step():
+        with xray.step("noop", step_type="generic"):
+            pass
+    results["step.context"] = _measure(context_step, number, 9, setup=xray.steps.clear)
+    
+    def noop():
+        return None
+    
+    def callable_step():
+        xray.step("noop", fn=noop)
+    results["step.callable"] = _measure(callable_step, number, 9, setup=xray.steps.clear)
+    return results
+
+
+def bench_stream(quick: bool) -> Dict[str, Dict]:
+    from xray.streaming import LocalEvaluationStream
+    
+    count = 5000 if quick else 50000
+    evaluations = _evaluations(count)
+    results = {}
+    for buffer_size in (1, 10, 100, 1000):
+        calibration = _calibration_seconds()
+        samples = []
+        for _ in range(5):
+            stream = LocalEvaluationStream(str(uuid.uuid4()), buffer_size=buffer_size)
+            started = time.perf_counter()
+            with stream:
+                for evaluation in evaluations:
+                    stream.write(evaluation)
+            samples.append((time.perf_counter() - started) / count)
+        results[f"stream.write.buffer_{buffer_size}"] = _summarize(samples, count,
+                                                                   min(calibration, _calibration_seconds()))
+    return results
+
+
+def bench_serialize(quick: bool) -> Dict[str, Dict]:
+    from xray.storage import LocalStorage
+    
+    storage = LocalStorage(base_dir="./bench_serialize")
+    results = {}
+    for steps in ((10, 100) if quick else (10, 100, 1000)):
+        xray = _execution_data(steps)
+        number = max(1, 2000 // steps)
+        results[f"execution.to_dict.steps_{steps}"] = _measure(xray.to_dict, number, 9)
+        data = xray.to_dict()
+        results[f"execution.save.steps_{steps}"] = _measure(lambda: storage.save(data), number, 9)
+    return results
+
+
+def bench_listing(quick: bool, sizes: List[int]) -> Dict[str, Dict]:
+    from xray.storage import LocalStorage
+    
+    results = {}
+    template = _execution_data(5).to_dict()
+    for size in sizes:
+        base_dir = f"./bench_list_{size}"
+        storage = LocalStorage(base_dir=base_dir)
+        for start in range(0, size, 1000):
+            batch = []
+            for _ in range(min(1000, size - start)):
+                data = dict(template, id=str(uuid.uuid4()))
+                batch.append(data)
+            storage.save_many(batch)
+        
+        label = f"{size // 1000}k" if size % 1000 == 0 else str(size)
+        
+        def reset_catalog():
+            storage._catalog.clear()
+        results[f"list_executions.{label}.cold"] = _measure(storage.list_executions, 1, 5, setup=reset_catalog)
+        results[f"list_executions.{label}.warm"] = _measure(storage.list_executions, 1 if size > 10000 else 5, 5)
+        shutil.rmtree(base_dir, ignore_errors=True)
+    return results
+
+
+def bench_pages(quick: bool) -> Dict[str, Dict]:
+    from xray.streaming import LocalEvaluationStream
+    
+    count = 20000 if quick else 100000
+    stream = LocalEvaluationStream("bench_pages")
+    with stream:
+        for evaluation in _evaluations(count):
+            stream.write(evaluation)
+    filepath = str(stream.filepath)
+    page_size = 50
+    last_page = count // page_size - 1
+    
+    results = {}
+    for label, page in (("first", 0), ("last", last_page)):
+        results[f"load_from_file.{label}"] = _measure(
+            lambda: LocalEvaluationStream.load_from_file(filepath, page, page_size), 50, 9)
+        results[f"load_from_file.{label}.failed_only"] = _measure(
+            lambda: LocalEvaluationStream.load_from_file(filepath, page // 4, page_size, qualified=False), 5, 9)
+    return results
+
+
+BENCHMARKS = {
+    "step": bench_step,
+    "stream": bench_stream,
+    "serialize": bench_serialize,
+    "listing": bench_listing,
+    "pages": bench_pages
+}
+
+
+def _filesystem_bound(name: str) -> bool:
+    return name.startswith("execution.save.") or (name.startswith("list_executions.") and name.endswith(".cold"))
+
+
+def compare_to_baseline(results: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Compare best runs; each benchmark may be slower by threshold or NOISE_FACTOR times its recorded noise.
+    
+    When both sides recorded a calibration, times are scaled by how much
+    slower the machine ran the calibration workload. A faster calibration is
+    not held against the code, since IO-bound benchmarks need not follow it.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous or not previous.get("min_us"):
+            continue
+        allowed = max(threshold, NOISE_FACTOR * previous.get("noise_pct", 0.0) / 100)
+        if _filesystem_bound(name):
+            allowed = max(allowed, FILESYSTEM_ALLOWANCE)
+        machine = 1.0
+        if previous.get("calibration_us") and result.get("calibration_us"):
+            machine = max(1.0, result["calibration_us"] / previous["calibration_us"])
+            result["machine_ratio"] = round(machine, 3)
+        ratio = result["min_us"] / previous["min_us"] / machine
+        result["baseline_min_us"] = previous["min_us"]
+        result["change_pct"] = round((ratio - 1) * 100, 1)
+        result["allowed_pct"] = round(allowed * 100, 1)
+        if ratio > 1 + allowed:
+            regressions.append(f"{name}: best {result['min_us']}us vs baseline {previous['min_us']}us "
+                               f"(+{result['change_pct']}%, allowed +{result['allowed_pct']}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the X-Ray offline benchmark suite")
+    parser.add_argument("--only", help=f"comma-separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads for a fast smoke run")
+    parser.add_argument("--list-sizes", default="1000,10000,100000",
+                        help="stored execution counts for the listing benchmark")
+    parser.add_argument("--baseline", help="stored result to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown of a benchmark's best run vs baseline (0.25 = 25%%); "
+                             "noisy benchmarks get more")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"write results as a baseline (default {DEFAULT_BASELINE.relative_to(REPO_ROOT)})")
+    parser.add_argument("--output", help="write the JSON result to this file as well as stdout")
+    args = parser.parse_args(argv)
+    
+    names = [name.strip() for name in (args.only or ",".join(BENCHMARKS)).split(",") if name.strip()]
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    list_sizes = [int(size) for size in args.list_sizes.split(",")]
+    if args.quick:
+        list_sizes = [size for size in list_sizes if size <= 10000]
+    
+    # Resolve file arguments before moving into the scratch directory
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+    save_path = Path(args.save_baseline).resolve() if args.save_baseline else None
+    output_path = Path(args.output).resolve() if args.output else None
+    baseline = json.loads(baseline_path.read_text()) if baseline_path else None
+    if baseline is not None and baseline.get("quick", False) != args.quick:
+        parser.error("baseline was recorded with a different --quick setting")
+    
+    workdir = tempfile.mkdtemp(prefix="xray-bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_ROOT))
+    logging.disable(logging.WARNING)
+    
+    results: Dict[str, Dict] = {}
+    try:
+        for name in names:
+            started = time.perf_counter()
+            if name == "listing":
+                results.update(bench_listing(args.quick, list_sizes))
+            else:
+                results.update(BENCHMARKS[name](args.quick))
+            print(f"{name}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    regressions = []
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+    
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "quick": args.quick,
+        "benchmarks": results,
+        "regressions": regressions
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if output_path:
+        output_path.write_text(output + "\n")
+    if save_path:
+        save_path.write_text(json.dumps({k: v for k, v in report.items() if k != "regressions"}, indent=2) + "\n")
+    
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
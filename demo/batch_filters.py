@@ -0,0 +1,234 @@
+"""Vectorized evaluation of the demo's price, rating and review filters.
+
+Candidates are held as columns (one array per field) and each built-in check
+is a single mask over all of them. The evaluation stream's JSON lines are then
+joined from whole columns of JSON text, so no per-item dicts or f-strings are
+built. NumPy is required (see requirements.txt); the per-item engine in
+demo_app is the dependency-free alternative.
+"""
+import json
+from itertools import repeat
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The batch filter engine requires numpy (pip install numpy); "
+                          "use filter_engine='item' without it")
+
+
+class ProductColumns:
+    """Columnar view of candidate products.
+    
+    When built from product dicts the dicts are kept so records() carries the
+    original values; otherwise, and always for lines(), item data is read
+    back from the columns.
+    """
+    
+    def __init__(self, asin: Sequence[str], title: Sequence[str], price, rating, reviews,
+                 products: Optional[List[dict]] = None):
+        _require_numpy()
+        self.asin = asin
+        self.title = title
+        self.price = _array(price, float)
+        self.rating = _array(rating, float)
+        self.reviews = _array(reviews, int)
+        self.products = products
+    
+    @classmethod
+    def from_products(cls, products: List[dict]) -> "ProductColumns":
+        return cls(
+            asin=[p['asin'] for p in products],
+            title=[p['title'] for p in products],
+            price=[p['price'] for p in products],
+            rating=[p['rating'] for p in products],
+            reviews=[p['reviews'] for p in products],
+            products=products
+        )
+    
+    def __len__(self) -> int:
+        return len(self.asin)
+    
+    def product(self, index: int) -> dict:
+        if self.products is not None:
+            return self.products[index]
+        return {
+            "asin": self.asin[index],
+            "title": self.title[index],
+            "price": _scalar(self.price[index]),
+            "rating": _scalar(self.rating[index]),
+            "reviews": _scalar(self.reviews[index])
+        }
+
+
+class BatchFilterResult:
+    """Check masks for a batch plus exact counts, with records built on demand"""
+    
+    def __init__(self, columns: ProductColumns, engine: "BatchFilterEngine", masks: Dict[str, Sequence[bool]],
+                 qualified: Sequence[bool], custom_results: List[List[dict]]):
+        self.columns = columns
+        self.masks = masks
+        self.qualified = qualified
+        self._engine = engine
+        self._custom_results = custom_results
+    
+    @property
+    def qualified_count(self) -> int:
+        return _count(self.qualified)
+    
+    def failure_counts(self) -> Dict[str, int]:
+        """Number of candidates failing each check; a candidate can fail several"""
+        return {name: len(self.columns) - _count(mask) for name, mask in self.masks.items()}
+    
+    def qualified_indices(self) -> List[int]:
+        return np.flatnonzero(self.qualified).tolist()
+    
+    def lines(self) -> List[str]:
+        """JSON lines (no trailing newline) for every candidate, in candidate order.
+        
+        Each line is what json.dumps gives for the matching records() entry,
+        but built column-wise: every field and check detail is converted as a
+        whole column, and rows are joined from the columns in one pass with no
+        per-item dicts or f-strings.
+        """
+        engine = self._engine
+        columns = self.columns
+        price = columns.price.astype(str).tolist()
+        rating = columns.rating.astype(str).tolist()
+        reviews = columns.reviews.tolist()
+        
+        parts = [
+            '{"item_id": ', _json_strings(columns.asin),
+            ', "item_data": {"title": ', _json_strings(columns.title),
+            ', "price": ', price, ', "rating": ', rating, ', "reviews": ', list(map(str, reviews)),
+            '}, "checks": [{"name": "price_range", "passed": ', _json_bools(self.masks["price_range"]),
+            ', "detail": "$', price,
+            _json_fragment(f" vs range ${engine.min_price:.2f}-${engine.max_price:.2f}") +
+            '"}, {"name": "min_rating", "passed": ', _json_bools(self.masks["min_rating"]),
+            ', "detail": "', rating,
+            _json_fragment(f"★ vs minimum {engine.min_rating}★") +
+            '"}, {"name": "min_reviews", "passed": ', _json_bools(self.masks["min_reviews"]),
+            ', "detail": "', list(map("{:,}".format, reviews)),
+            _json_fragment(f" vs minimum {engine.min_reviews:,}") + '"}'
+        ]
+        for results in self._custom_results:
+            # Custom checks are arbitrary dicts, so they are serialized per item
+            parts.extend([", ", list(map(json.dumps, results))])
+        parts.extend(['], "qualified": ', _json_bools(self.qualified), '}'])
+        
+        return list(map("".join, zip(*(repeat(part) if isinstance(part, str) else part for part in parts))))
+    
+    def records(self) -> Iterator[dict]:
+        """Yield evaluation records in candidate order, in the same shape as the per-item evaluator.
+        
+        Records are built one at a time as they are consumed; lines() is the
+        fast path when the records are only going to be serialized.
+        """
+        engine = self._engine
+        price_range = f"${engine.min_price:.2f}-${engine.max_price:.2f}"
+        min_rating = f"{engine.min_rating}★"
+        min_reviews = f"{engine.min_reviews:,}"
+        price_mask = self.masks["price_range"].tolist()
+        rating_mask = self.masks["min_rating"].tolist()
+        review_mask = self.masks["min_reviews"].tolist()
+        qualified = self.qualified.tolist()
+        
+        for i in range(len(self.columns)):
+            product = self.columns.product(i)
+            checks = [
+                {"name": "price_range", "passed": price_mask[i],
+                 "detail": f"${product['price']} vs range {price_range}"},
+                {"name": "min_rating", "passed": rating_mask[i],
+                 "detail": f"{product['rating']}★ vs minimum {min_rating}"},
+                {"name": "min_reviews", "passed": review_mask[i],
+                 "detail": f"{product['reviews']:,} vs minimum {min_reviews}"}
+            ]
+            for results in self._custom_results:
+                checks.append(results[i])
+            yield {
+                "item_id": product['asin'],
+                "item_data": {
+                    "title": product['title'],
+                    "price": product['price'],
+                    "rating": product['rating'],
+                    "reviews": product['reviews']
+                },
+                "checks": checks,
+                "qualified": qualified[i]
+            }
+
+
+class BatchFilterEngine:
+    """Applies the price range, minimum rating and minimum review checks to a whole batch.
+    
+    custom_checks are callables taking a product dict and returning a check
+    dict ({"name", "passed", "detail"}); they are run per item and combined
+    with the vectorized masks.
+    """
+    
+    def __init__(self, min_price: float, max_price: float, min_rating: float, min_reviews: int,
+                 custom_checks: Optional[List[Callable[[dict], dict]]] = None):
+        _require_numpy()
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_rating = min_rating
+        self.min_reviews = min_reviews
+        self.custom_checks = list(custom_checks or [])
+    
+    @classmethod
+    def from_params(cls, reference_product: dict, min_price_mult: float, max_price_mult: float,
+                    min_rating: float, min_reviews: int, **kwargs) -> "BatchFilterEngine":
+        ref_price = reference_product['price']
+        return cls(ref_price * min_price_mult, ref_price * max_price_mult, min_rating, min_reviews, **kwargs)
+    
+    def run(self, columns: ProductColumns) -> BatchFilterResult:
+        masks = {
+            "price_range": (columns.price >= self.min_price) & (columns.price <= self.max_price),
+            "min_rating": columns.rating >= self.min_rating,
+            "min_reviews": columns.reviews >= self.min_reviews
+        }
+        qualified = masks["price_range"] & masks["min_rating"] & masks["min_reviews"]
+        
+        custom_results = []
+        for check in self.custom_checks:
+            results = [check(columns.product(i)) for i in range(len(columns))]
+            passed = np.array([bool(result["passed"]) for result in results], dtype=bool)
+            if results:
+                masks[results[0]["name"]] = passed
+            qualified = qualified & passed
+            custom_results.append(results)
+        
+        return BatchFilterResult(columns, self, masks, qualified, custom_results)
+
+
+def _array(values, dtype):
+    return np.asarray(values, dtype=np.float64 if dtype is float else np.int64)
+
+
+def _scalar(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+def _count(mask) -> int:
+    return int(np.count_nonzero(mask))
+
+
+def _json_strings(values: Sequence[str]) -> List[str]:
+    """Quoted JSON strings, escaped exactly as json.dumps does"""
+    return list(map(encode_basestring_ascii, values))
+
+
+def _json_fragment(text: str) -> str:
+    """text escaped for use inside a JSON string literal"""
+    return encode_basestring_ascii(text)[1:-1]
+
+
+def _json_bools(mask) -> List[str]:
+    return np.where(mask, "true", "false").tolist()
+
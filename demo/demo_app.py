@@ -1,8 +1,18 @@
 import sys
 sys.path.insert(0, '..')
 
+import heapq
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import tee
+from typing import Callable, Optional
+
+from .batch_filters import BatchFilterEngine, ProductColumns
 from .mock_data import get_reference_product, get_mock_search_results
+from .synthetic import SyntheticCatalog
 from xray import XRay
+from xray.batching import ItemFailed
 
 
 def generate_keywords(product: dict) -> dict:
@@ -34,6 +44,19 @@ def generate_keywords(product: dict) -> dict:
     }
 
 
+def explain_keywords(keyword_result: dict) -> str:
+    extraction_logic = keyword_result['extraction_logic']
+    extraction_parts = [f"{attribute} ({extraction_logic[attribute]})"
+                        for attribute in ('material', 'capacity', 'feature') if attribute in extraction_logic]
+    
+    return (
+        f"LLM extracted {len(keyword_result['keywords'])} search keywords by identifying key product attributes: "
+        f"{', '.join(extraction_parts)}. "
+        f"These keywords will be used to query the search API for similar products. "
+        f"Strategy: Cast a wide net with variations to maximize relevant results."
+    )
+
+
 def search_products(keywords: list, limit: int = 50) -> list:
     return get_mock_search_results(limit)
 
@@ -110,16 +133,31 @@ def evaluate_relevance(product: dict, reference_product: dict) -> dict:
     }
 
 
-def rank_and_select(candidates: list, reference_product: dict) -> dict: 
-    if not candidates:
-        return None
+def evaluate_relevance_batch(products: list, reference_product: dict) -> list:
+    """One batched LLM request classifying several products"""
+    return [evaluate_relevance(product, reference_product) for product in products]
+
+
+def rank_and_select(candidates, reference_product: dict, k: int = 5,
+                    on_scored: Optional[Callable[[dict, dict, bool], None]] = None) -> dict:
+    """Score candidates as they arrive and keep only the k best in a bounded heap.
+    
+    candidates may be any iterable; memory is O(k) and time O(n log k).
+    on_scored, if given, is called with (product, scores, admitted) for every
+    candidate as it is scored; admitted says whether it entered the running
+    top k. A candidate that is not admitted can never be selected.
+    Ranked entries carry each candidate's position in the input as "index".
+    Ties keep the earlier candidate first.
+    """
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    ref_price = reference_product['price']
     
     def calculate_score(product):
         review_score = min(product['reviews'] / 10000, 1.0)
         
         rating_score = (product['rating'] - 3.8) / (5.0 - 3.8)
         
-        ref_price = reference_product['price']
         price_diff = abs(product['price'] - ref_price)
         max_diff = ref_price 
         price_score = max(0, 1 - (price_diff / max_diff))
@@ -133,21 +171,30 @@ def rank_and_select(candidates: list, reference_product: dict) -> dict:
             "total_score": round(total, 3)
         }
     
-    ranked = []
-    for product in candidates:
+    # Min-heap of (score, -index, ...): the root is the weakest of the current top k
+    heap = []
+    for index, product in enumerate(candidates):
         scores = calculate_score(product)
-        ranked.append({
-            "product": product,
-            "scores": scores
-        })
+        entry = (scores['total_score'], -index, scores, product)
+        admitted = len(heap) < k or entry[:2] > heap[0][:2]
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif admitted:
+            heapq.heapreplace(heap, entry)
+        
+        if on_scored is not None:
+            on_scored(product, scores, admitted)
     
-    ranked.sort(key=lambda x: x['scores']['total_score'], reverse=True)
+    if not heap:
+        return None
     
+    ranked = [{"product": product, "scores": scores, "index": -negative_index}
+              for _, negative_index, scores, product in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
     winner = ranked[0]
     return {
         "selected_product": winner['product'],
         "scores": winner['scores'],
-        "ranked_list": ranked[:5]  
+        "ranked_list": ranked
     }
 
 
@@ -162,6 +209,13 @@ def demo_workflow_orchestrator(params: dict):
             - max_price_multiplier (float): Max price multiplier vs reference
             - min_rating (float): Minimum star rating
             - min_reviews (int): Minimum review count
+            - dataset (str): "mock" (hand-written results) or "synthetic" (generated catalog)
+            - seed, pass_rate, price_spread: SyntheticCatalog parameters for the synthetic dataset
+            - filter_engine (str): "batch" (vectorized masks) or "item" (per-product evaluation)
+            - filter_workers (int): Workers for the "item" engine in apply_filters (1 = serial)
+            - filter_executor (str): "thread" or "process" pool for filter_workers > 1
+            - relevance_batch_size (int): Products per batched relevance LLM call
+            - relevance_concurrency (int): Concurrent relevance batches
     
     Returns:
         dict: X-Ray execution data with full workflow trace
@@ -171,46 +225,40 @@ def demo_workflow_orchestrator(params: dict):
     max_price_mult = params.get('max_price_multiplier', 2.0)
     min_rating = params.get('min_rating', 3.8)
     min_reviews = params.get('min_reviews', 100)
+    dataset = params.get('dataset', 'mock')
+    filter_engine = params.get('filter_engine', 'batch')
+    filter_workers = params.get('filter_workers', 1)
+    filter_executor = params.get('filter_executor', 'thread')
+    relevance_batch_size = params.get('relevance_batch_size', 10)
+    relevance_concurrency = params.get('relevance_concurrency', 4)
     
     reference_product = get_reference_product()
     
     with XRay.start("competitor_product_selection", tags={"demo": True, "api": True}) as xray:
         
         # Step 1: Keyword Generation
-        with xray.step("keyword_generation", step_type="llm", 
-                       reasoning="Extract key search terms from product title") as step:
-            step.set_input(
-                product_title=reference_product['title'],
-                category=reference_product['category']
-            )
-            
-            keyword_result = generate_keywords(reference_product)
-            keywords = keyword_result['keywords']
-            
-            step.set_output(keyword_result)
-            step.set_metadata(model="mock-gpt-4", temperature=0.7)
-            
-            extraction_parts = []
-            if 'material' in keyword_result['extraction_logic']:
-                extraction_parts.append(f"material ({keyword_result['extraction_logic']['material']})")
-            if 'capacity' in keyword_result['extraction_logic']:
-                extraction_parts.append(f"capacity ({keyword_result['extraction_logic']['capacity']})")
-            if 'feature' in keyword_result['extraction_logic']:
-                extraction_parts.append(f"feature ({keyword_result['extraction_logic']['feature']})")
-            
-            step.set_reasoning(
-                f"LLM extracted {len(keywords)} search keywords by identifying key product attributes: "
-                f"{', '.join(extraction_parts)}. "
-                f"These keywords will be used to query the search API for similar products. "
-                f"Strategy: Cast a wide net with variations to maximize relevant results."
-            )
+        # Callable form, so the recorded args can be replayed (benchmarks/replay.py)
+        keyword_result = xray.step("keyword_generation", generate_keywords, step_type="llm",
+                                   reasoning=explain_keywords, args=(reference_product,),
+                                   metadata={"model": "mock-gpt-4", "temperature": 0.7})
+        keywords = keyword_result['keywords']
         
         # Step 2: Search Products
         with xray.step("search_products", step_type="api",
                        reasoning="Retrieve candidate products from search API") as step:
-            step.set_input(keywords=keywords, limit=num_candidates)
+            step.set_input(keywords=keywords, limit=num_candidates, dataset=dataset)
             
-            candidates = get_mock_search_results(num_candidates)
+            if dataset == 'synthetic':
+                # Kept lazy: products are generated chunk by chunk as the filter step reads them
+                candidates = SyntheticCatalog(num_candidates, seed=params.get('seed', 0),
+                                              pass_rate=params.get('pass_rate', 0.6),
+                                              price_spread=params.get('price_spread', 0.35),
+                                              reference_product=reference_product,
+                                              min_price_mult=min_price_mult, max_price_mult=max_price_mult,
+                                              min_rating=min_rating, min_reviews=min_reviews,
+                                              chunk_size=FILTER_CHUNK_SIZE)
+            else:
+                candidates = get_mock_search_results(num_candidates)
             
             step.set_output({
                 "total_results": 2847,
@@ -248,34 +296,58 @@ def demo_workflow_orchestrator(params: dict):
                 }
             )
             
-            qualified = []
-            price_failures = 0
-            rating_failures = 0
-            review_failures = 0
+            step.set_metadata(filter_engine=filter_engine, filter_workers=filter_workers,
+                              filter_executor=filter_executor)
             
-            with step.evaluation_stream() as stream:
-                for product in candidates:
-                    evaluation = _evaluate_product_with_params(
-                        product, 
-                        reference_product,
-                        min_price_mult,
-                        max_price_mult,
-                        min_rating,
-                        min_reviews
-                    )
-                    stream.write(evaluation)
-                    
-                    if evaluation["qualified"]:
-                        qualified.append(product)
-                    else:
-                        for check in evaluation['checks']:
-                            if not check['passed']:
-                                if check['name'] == 'price_range':
-                                    price_failures += 1
-                                elif check['name'] == 'min_rating':
-                                    rating_failures += 1
-                                elif check['name'] == 'min_reviews':
-                                    review_failures += 1
+            if filter_engine == 'batch':
+                # Vectorized masks; JSON lines are built column-wise from the masks in candidate order
+                engine = BatchFilterEngine.from_params(reference_product, min_price_mult, max_price_mult,
+                                                       min_rating, min_reviews)
+                qualified = []
+                price_failures = rating_failures = review_failures = 0
+                with step.evaluation_stream() as stream:
+                    for chunk in _candidate_chunks(candidates, FILTER_CHUNK_SIZE):
+                        result = engine.run(ProductColumns.from_products(chunk))
+                        stream.write_serialized(result.lines(), result.qualified.tolist())
+                        qualified.extend(chunk[i] for i in result.qualified_indices())
+                        failure_counts = result.failure_counts()
+                        price_failures += failure_counts['price_range']
+                        rating_failures += failure_counts['min_rating']
+                        review_failures += failure_counts['min_reviews']
+            else:
+                qualified = []
+                price_failures = 0
+                rating_failures = 0
+                review_failures = 0
+                
+                evaluate = partial(
+                    _evaluate_product_with_params,
+                    reference_product=reference_product,
+                    min_price_mult=min_price_mult,
+                    max_price_mult=max_price_mult,
+                    min_rating=min_rating,
+                    min_reviews=min_reviews
+                )
+                # tee keeps only the products evaluate_candidates has run ahead by
+                products, to_evaluate = tee(candidates)
+                evaluations = evaluate_candidates(to_evaluate, evaluate, filter_workers, filter_executor,
+                                                  total=len(candidates))
+                
+                with step.evaluation_stream() as stream:
+                    for product, evaluation in zip(products, evaluations):
+                        stream.write(evaluation)
+                        
+                        if evaluation["qualified"]:
+                            qualified.append(product)
+                        else:
+                            for check in evaluation['checks']:
+                                if not check['passed']:
+                                    if check['name'] == 'price_range':
+                                        price_failures += 1
+                                    elif check['name'] == 'min_rating':
+                                        rating_failures += 1
+                                    elif check['name'] == 'min_reviews':
+                                        review_failures += 1
             
             step.set_output({
                 "qualified_count": len(qualified),
@@ -310,11 +382,40 @@ def demo_workflow_orchestrator(params: dict):
                 prompt_strategy="Compare each candidate title and category against reference to identify non-bottle products"
             )
             
+            def relevance_evaluation(product, relevance):
+                if isinstance(relevance, ItemFailed):
+                    return {
+                        "item_id": product['asin'],
+                        "item_data": {"title": product['title'], "category": product.get('category')},
+                        "checks": [{"name": "relevance", "passed": False, "detail": f"LLM call failed: {relevance}"}],
+                        "qualified": False
+                    }
+                return {
+                    "item_id": product['asin'],
+                    "item_data": {
+                        "title": product['title'],
+                        "category": product.get('category'),
+                        "confidence": relevance['confidence']
+                    },
+                    "checks": [{"name": "relevance", "passed": relevance['is_competitor'],
+                                "detail": relevance['reason']}],
+                    "qualified": relevance['is_competitor']
+                }
+            
+            relevances = step.run_batched(
+                qualified,
+                lambda batch: evaluate_relevance_batch(batch, reference_product),
+                relevance_evaluation,
+                batch_size=relevance_batch_size,
+                max_concurrency=relevance_concurrency
+            )
+            
             true_competitors = []
             false_positives = []
             
-            for product in qualified:
-                relevance = evaluate_relevance(product, reference_product)
+            for product, relevance in zip(qualified, relevances):
+                if relevance is None:
+                    continue
                 
                 if relevance['is_competitor']:
                     true_competitors.append(product)
@@ -360,7 +461,38 @@ def demo_workflow_orchestrator(params: dict):
                     }
                 )
                 
-                rank_result = rank_and_select(true_competitors, reference_product)
+                top_k = 5
+                
+                # Streamed as each candidate is scored, so memory stays O(k): qualified means the
+                # candidate entered the running top k, and failures were eliminated for good.
+                # The final top k comes from the heap and is recorded in the step output.
+                with step.evaluation_stream() as stream:
+                    def write_score(product, scores, admitted):
+                        stream.write({
+                            "item_id": product['asin'],
+                            "item_data": {
+                                "title": product['title'],
+                                "price": product['price'],
+                                "rating": product['rating'],
+                                "reviews": product['reviews'],
+                                "total_score": scores['total_score']
+                            },
+                            "checks": [
+                                {"name": "review_score", "passed": True,
+                                 "detail": f"{scores['review_score']:.3f} x 60%"},
+                                {"name": "rating_score", "passed": True,
+                                 "detail": f"{scores['rating_score']:.3f} x 30%"},
+                                {"name": "price_score", "passed": True,
+                                 "detail": f"{scores['price_score']:.3f} x 10%"},
+                                {"name": "top_k", "passed": admitted,
+                                 "detail": (f"{scores['total_score']:.3f} entered the running top {top_k}" if admitted
+                                            else f"{scores['total_score']:.3f} did not beat the running top {top_k}")}
+                            ],
+                            "qualified": admitted
+                        })
+                    
+                    rank_result = rank_and_select(true_competitors, reference_product, k=top_k,
+                                                  on_scored=write_score)
                 winner = rank_result['selected_product']
                 winner_scores = rank_result['scores']
                 runner_up = rank_result['ranked_list'][1] if len(rank_result['ranked_list']) > 1 else None
@@ -383,8 +515,13 @@ def demo_workflow_orchestrator(params: dict):
                     "rating": winner['rating'],
                     "reviews": winner['reviews'],
                     "scores": winner_scores,
-                    "top_3_alternatives": top_alternatives
+                    "top_3_alternatives": top_alternatives,
+                    "top_k": [{"rank": rank, "item_id": item['product']['asin'], "index": item['index'],
+                               "total_score": item['scores']['total_score']}
+                              for rank, item in enumerate(rank_result['ranked_list'], start=1)],
+                    "candidates_scored": len(true_competitors)
                 })
+                step.set_metadata(top_k=top_k)
                 
                 score_diff = winner_scores['total_score'] - runner_up['scores']['total_score'] if runner_up else 0
                 step.set_reasoning(
@@ -447,3 +584,59 @@ def _evaluate_product_with_params(product: dict, reference_product: dict,
         "qualified": all_passed
     }
 
+
+FILTER_EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+FILTER_CHUNK_SIZE = 10000
+
+
+def _candidate_chunks(candidates, size: int):
+    """Lists of up to size candidates; synthetic catalogs are generated one chunk at a time"""
+    if isinstance(candidates, SyntheticCatalog):
+        yield from candidates.batches(size)
+        return
+    for start in range(0, len(candidates), size):
+        yield candidates[start:start + size]
+
+
+def _evaluate_batch(evaluate, products: list) -> list:
+    return [evaluate(product) for product in products]
+
+
+def evaluate_candidates(candidates, evaluate, workers: int = 1, executor: str = "thread",
+                        batch_size: int = None, total: int = None):
+    """Yield evaluate(product) for each candidate, in candidate order.
+    
+    With workers > 1, candidates are split into batches that run on a thread
+    or process pool. At most two batches per worker are in flight, so memory
+    stays bounded for large candidate sets, and results are yielded in
+    submission order so stream output is identical to a serial run. total sizes
+    the batches when candidates is an iterator without a length. A process
+    pool needs evaluate to be picklable (a module-level function or a partial
+    of one); threads only help when evaluate releases the GIL.
+    """
+    if executor not in FILTER_EXECUTORS:
+        raise ValueError(f"executor must be one of: {', '.join(FILTER_EXECUTORS)}")
+    if workers <= 1:
+        for product in candidates:
+            yield evaluate(product)
+        return
+    
+    if batch_size is None:
+        if total is None:
+            total = len(candidates) if hasattr(candidates, '__len__') else 0
+        batch_size = max(64, min(4096, total // (workers * 4) or 64))
+    
+    with FILTER_EXECUTORS[executor](max_workers=workers) as pool:
+        pending = deque()
+        batch = []
+        for product in candidates:
+            batch.append(product)
+            if len(batch) == batch_size:
+                pending.append(pool.submit(_evaluate_batch, evaluate, batch))
+                batch = []
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+        if batch:
+            pending.append(pool.submit(_evaluate_batch, evaluate, batch))
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,146 @@
+"""
+Seeded synthetic product catalogs for benchmarks and load tests.
+"""
+import random
+from typing import Dict, Iterator, List
+
+from .mock_data import REFERENCE_PRODUCT
+
+BRANDS = ["HydroFlask", "Yeti", "Stanley", "Contigo", "CamelBak", "Nalgene", "Thermos", "Iron Flask",
+          "Simple Modern", "Takeya", "Klean Kanteen", "Owala", "ThermoFlask", "Zojirushi", "S'well"]
+MATERIALS = ["Stainless Steel", "Insulated", "Vacuum Insulated", "Double Wall", "Tritan Plastic", "Glass"]
+CAPACITIES = ["12oz", "16oz", "18oz", "20oz", "24oz", "26oz", "30oz", "32oz", "40oz", "64oz"]
+STYLES = ["Water Bottle", "Wide Mouth Bottle", "Sport Bottle", "Tumbler with Straw", "Flask", "Chug Bottle"]
+ACCESSORIES = [
+    ("Replacement Lid", "Sports & Outdoors > Water Bottle Accessories"),
+    ("Bottle Cleaning Brush Set", "Home & Kitchen > Cleaning Supplies"),
+    ("Carrier Sleeve with Strap", "Sports & Outdoors > Water Bottle Accessories"),
+    ("Bottle Drying Rack Stand", "Home & Kitchen > Kitchen Storage"),
+    ("Silicone Bottle Boot", "Sports & Outdoors > Water Bottle Accessories"),
+    ("Straw Replacement Kit", "Sports & Outdoors > Water Bottle Accessories"),
+]
+CATEGORY = "Sports & Outdoors > Water Bottles"
+
+FAILURE_MODES = ("price_range", "min_rating", "min_reviews")
+
+
+class SyntheticCatalog:
+    """Lazily generated candidate products with controllable filter outcomes.
+    
+    Products are produced in chunks, each drawn from its own generator seeded
+    with (seed, chunk index), so a catalog is identical on every iteration
+    and any slice can be regenerated without producing what comes before it.
+    
+    pass_rate is the fraction of products that pass the demo's default
+    filters (or the thresholds given here); failing products miss one check,
+    or two with probability multi_failure_rate. price_spread is the log-scale
+    spread of prices around the reference price. competitor_rate is the
+    fraction of products that are real bottles rather than accessories the
+    relevance check should reject.
+    """
+    
+    def __init__(self, size: int, seed: int = 0, pass_rate: float = 0.6, price_spread: float = 0.35,
+                 competitor_rate: float = 0.85, multi_failure_rate: float = 0.2,
+                 reference_product: Dict = None, min_price_mult: float = 0.5, max_price_mult: float = 2.0,
+                 min_rating: float = 3.8, min_reviews: int = 100, chunk_size: int = 10000):
+        if size < 0:
+            raise ValueError("size must be non-negative")
+        for name, value in (("pass_rate", pass_rate), ("competitor_rate", competitor_rate),
+                            ("multi_failure_rate", multi_failure_rate)):
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1")
+        if price_spread <= 0:
+            raise ValueError("price_spread must be positive")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        
+        self.size = size
+        self.seed = seed
+        self.pass_rate = pass_rate
+        self.price_spread = price_spread
+        self.competitor_rate = competitor_rate
+        self.multi_failure_rate = multi_failure_rate
+        self.reference_product = reference_product or REFERENCE_PRODUCT
+        self.min_price = self.reference_product['price'] * min_price_mult
+        self.max_price = self.reference_product['price'] * max_price_mult
+        self.min_rating = min_rating
+        self.min_reviews = min_reviews
+        self.chunk_size = chunk_size
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __iter__(self) -> Iterator[Dict]:
+        for start in range(0, self.size, self.chunk_size):
+            yield from self.chunk(start // self.chunk_size)
+    
+    def batches(self, batch_size: int) -> Iterator[List[Dict]]:
+        """Yield products in lists of batch_size (the last may be shorter)"""
+        batch = []
+        for product in self:
+            batch.append(product)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def chunk(self, index: int) -> List[Dict]:
+        start = index * self.chunk_size
+        end = min(start + self.chunk_size, self.size)
+        rng = random.Random(f"{self.seed}:{index}")
+        return [self._product(rng, i) for i in range(start, end)]
+    
+    def _product(self, rng: random.Random, index: int) -> Dict:
+        failures = set()
+        if rng.random() >= self.pass_rate:
+            failures.add(rng.choice(FAILURE_MODES))
+            if rng.random() < self.multi_failure_rate:
+                failures.add(rng.choice(FAILURE_MODES))
+        
+        is_competitor = rng.random() < self.competitor_rate
+        if is_competitor:
+            title = (f"{rng.choice(BRANDS)} {rng.choice(MATERIALS)} {rng.choice(STYLES)} "
+                     f"{rng.choice(CAPACITIES)}")
+            category = CATEGORY
+        else:
+            accessory, category = rng.choice(ACCESSORIES)
+            title = f"{rng.choice(BRANDS)} {accessory}"
+        
+        return {
+            "asin": f"B0SYN{index:08d}",
+            "title": title,
+            "category": category,
+            "price": self._price(rng, "price_range" in failures),
+            "rating": self._rating(rng, "min_rating" in failures),
+            "reviews": self._reviews(rng, "min_reviews" in failures),
+            "is_competitor": is_competitor
+        }
+    
+    def _price(self, rng: random.Random, fail: bool) -> float:
+        reference = self.reference_product['price']
+        if fail:
+            if rng.random() < 0.5:
+                price = rng.uniform(0.99, max(1.0, self.min_price - 0.01))
+            else:
+                price = self.max_price * (1 + rng.expovariate(1 / self.price_spread)) + 0.01
+            return round(price, 2)
+        price = round(min(max(reference * rng.lognormvariate(0.0, self.price_spread), self.min_price),
+                          self.max_price), 2)
+        # Rounding may step just outside the range
+        if price < self.min_price:
+            price = round(price + 0.01, 2)
+        elif price > self.max_price:
+            price = round(price - 0.01, 2)
+        return price
+    
+    def _rating(self, rng: random.Random, fail: bool) -> float:
+        if fail:
+            return round(rng.uniform(1.0, max(1.0, self.min_rating - 0.1)), 1)
+        # Marketplace ratings cluster near the top of the scale
+        return round(min(5.0, max(self.min_rating, 5.0 - rng.expovariate(2.5))), 1)
+    
+    def _reviews(self, rng: random.Random, fail: bool) -> int:
+        if fail:
+            return rng.randrange(0, max(1, self.min_reviews))
+        return max(self.min_reviews, int(rng.lognormvariate(7.0, 1.3)))
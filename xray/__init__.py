@@ -5,7 +5,8 @@ A library for capturing and visualizing multi-step decision-making processes.
 
 from .core import XRay, XRayExecution, Step
 from .streaming import EvaluationStream
+from .memo import CachePolicy, DiskCacheStore
 
 __version__ = "0.1.0"
-__all__ = ["XRay", "XRayExecution", "Step", "EvaluationStream"]
+__all__ = ["XRay", "XRayExecution", "Step", "EvaluationStream", "CachePolicy", "DiskCacheStore"]
 
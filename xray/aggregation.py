@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import random
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class _FieldStats:
+    """Exact count/min/max/mean plus a reservoir sample for quantiles"""
+    
+    def __init__(self, reservoir_size: int, rng: random.Random):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.passed_count = 0
+        self.passed_total = 0.0
+        self._reservoir: List[float] = []
+        self._reservoir_size = reservoir_size
+        self._rng = rng
+    
+    def add(self, value: float, qualified: bool):
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        if qualified:
+            self.passed_count += 1
+            self.passed_total += value
+        
+        if len(self._reservoir) < self._reservoir_size:
+            self._reservoir.append(value)
+        else:
+            slot = self._rng.randrange(self.count)
+            if slot < self._reservoir_size:
+                self._reservoir[slot] = value
+    
+    def to_dict(self) -> Dict:
+        sample = sorted(self._reservoir)
+        failed_count = self.count - self.passed_count
+        return {
+            "count": self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": round(self.total / self.count, 4),
+            "passed_mean": round(self.passed_total / self.passed_count, 4) if self.passed_count else None,
+            "failed_mean": round((self.total - self.passed_total) / failed_count, 4) if failed_count else None,
+            "quantiles": {f"p{round(q * 100)}": sample[min(int(q * len(sample)), len(sample) - 1)]
+                          for q in QUANTILES},
+            "exact_quantiles": self.count <= self._reservoir_size
+        }
+
+
+def aggregate_evaluations(evaluations: Iterable[Dict], max_combinations: int = 50,
+                          reservoir_size: int = 4096, seed: int = 0) -> Dict:
+    """Failure breakdown of evaluations in a single pass.
+    
+    Counts failures per check, the exact sets of checks that failed together,
+    and distributions of numeric item_data fields. Quantiles come from a
+    seeded reservoir sample and are exact up to reservoir_size items.
+    """
+    rng = random.Random(seed)
+    total = passed = 0
+    checks: Dict[str, Dict[str, int]] = {}
+    combinations: Counter = Counter()
+    fields: Dict[str, _FieldStats] = {}
+    
+    for evaluation in evaluations:
+        total += 1
+        qualified = bool(evaluation.get("qualified", False))
+        if qualified:
+            passed += 1
+        
+        failed_checks = []
+        for check in evaluation.get("checks") or []:
+            name = check.get("name", "unnamed")
+            stats = checks.setdefault(name, {"evaluated": 0, "failed": 0})
+            stats["evaluated"] += 1
+            if not check.get("passed", False):
+                stats["failed"] += 1
+                failed_checks.append(name)
+        if failed_checks:
+            combinations[tuple(sorted(failed_checks))] += 1
+        
+        for field, value in (evaluation.get("item_data") or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats = fields.get(field)
+                if stats is None:
+                    stats = fields[field] = _FieldStats(reservoir_size, rng)
+                stats.add(float(value), qualified)
+    
+    for stats in checks.values():
+        stats["fail_rate"] = round(stats["failed"] / stats["evaluated"] * 100, 2)
+    
+    return {
+        "total": total,
+        "passed": passed,
+        "failed": total - passed,
+        "pass_rate": round(passed / total * 100, 2) if total else 0.0,
+        "failures_by_check": {name: stats["failed"] for name, stats in checks.items()},
+        "checks": checks,
+        "co_failures": [{"checks": list(names), "count": count}
+                        for names, count in combinations.most_common(max_combinations)],
+        "fields": {field: stats.to_dict() for field, stats in fields.items()}
+    }
+
+
+def _parse_lines(lines, source: str):
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse evaluation at line {i+1} in {source}: {e}")
+
+
+_summary_cache = LRUCache(max_entries=128, max_bytes=16 * 1024 * 1024)
+
+
+def summarize_evaluation_file(filepath: str) -> Optional[Dict]:
+    """Aggregate a streamed evaluation file, cached until the file changes.
+    
+    Local files are cached by path and identity (inode, size, mtime). Vercel
+    Blob files are streamed on every call. Returns None if the file is missing.
+    """
+    if os.getenv('DEPLOYMENT_MODE', 'local') == 'vercel':
+        return _summarize_blob(filepath)
+    
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    
+    key = os.path.abspath(filepath)
+    validator = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    summary = _summary_cache.get(key, validator)
+    if summary is not None:
+        return summary
+    
+    with open(filepath, 'r', encoding='utf-8') as f:
+        summary = aggregate_evaluations(_parse_lines(f, filepath))
+    _summary_cache.put(key, summary, len(json.dumps(summary)), validator)
+    return summary
+
+
+def _summarize_blob(filepath: str) -> Optional[Dict]:
+    token = os.getenv('BLOB_READ_WRITE_TOKEN')
+    filename = filepath.replace('xray_data/', '')
+    response = requests.get(f"https://blob.vercel-storage.com/{filename}",
+                            headers={"Authorization": f"Bearer {token}"}, stream=True)
+    if response.status_code != 200:
+        logger.warning(f"Failed to load evaluations from blob: {response.text}")
+        return None
+    with response:
+        return aggregate_evaluations(_parse_lines(response.iter_lines(), filepath))
+
+
+def summary_cache_stats() -> Dict:
+    return _summary_cache.stats()
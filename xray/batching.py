@@ -0,0 +1,117 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class ItemFailed(Exception):
+    """Recorded in place of an item's result when all attempts failed"""
+
+
+def _chunks(items: Sequence, size: int) -> List[List]:
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def _call_batch(batch_fn: Callable[[List], List], batch: List, max_retries: int, retry_backoff: float) -> Dict:
+    """Run one batch, then retry each failed item on its own.
+    
+    batch_fn takes a list of items and returns one result per item; an
+    Exception instance in place of a result marks that item as failed. If the
+    whole call raises, every item in the batch is retried individually.
+    """
+    started = time.perf_counter()
+    try:
+        results = list(batch_fn(batch))
+        if len(results) != len(batch):
+            raise ValueError(f"batch function returned {len(results)} results for {len(batch)} items")
+    except Exception as e:
+        logger.warning(f"Batch of {len(batch)} items failed, retrying items individually: {e}")
+        results = [e] * len(batch)
+    
+    attempts = [1] * len(batch)
+    retried = 0
+    for i, item in enumerate(batch):
+        if not isinstance(results[i], Exception):
+            continue
+        retried += 1
+        for attempt in range(max_retries):
+            if retry_backoff:
+                time.sleep(retry_backoff * (2 ** attempt))
+            attempts[i] += 1
+            try:
+                result = batch_fn([item])[0]
+            except Exception as e:
+                result = e
+            results[i] = result
+            if not isinstance(result, Exception):
+                break
+    
+    return {
+        "results": results,
+        "attempts": attempts,
+        "total_ms": (time.perf_counter() - started) * 1000,
+        "retried": retried
+    }
+
+
+def run_batched(items: Sequence, batch_fn: Callable[[List], List], batch_size: int = 10,
+                max_concurrency: int = 4, max_retries: int = 2, retry_backoff: float = 0.0,
+                on_result: Optional[Callable[[Any, Any, int], None]] = None) -> Dict:
+    """Dispatch items to batch_fn in batches, at most max_concurrency batches at a time.
+    
+    on_result(item, result, attempts) is called from the calling thread for
+    every item in input order; result is an ItemFailed wrapping the last error
+    if all attempts failed. Returns the results in input order (None for
+    failed items) and batch latency statistics.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be positive")
+    if max_retries < 0:
+        raise ValueError("max_retries must be non-negative")
+    
+    batches = _chunks(items, batch_size)
+    results: List[Any] = []
+    batch_latencies: List[float] = []
+    retried = failed = 0
+    started = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = [pool.submit(_call_batch, batch_fn, batch, max_retries, retry_backoff) for batch in batches]
+        for batch, future in zip(batches, futures):
+            outcome = future.result()
+            batch_latencies.append(outcome["total_ms"])
+            retried += outcome["retried"]
+            for item, result, attempts in zip(batch, outcome["results"], outcome["attempts"]):
+                if isinstance(result, Exception):
+                    failed += 1
+                    result = ItemFailed(f"{type(result).__name__}: {result}")
+                if on_result is not None:
+                    on_result(item, result, attempts)
+                results.append(None if isinstance(result, ItemFailed) else result)
+    
+    wall_ms = (time.perf_counter() - started) * 1000
+    ordered = sorted(batch_latencies)
+    return {
+        "results": results,
+        "stats": {
+            "items": len(items),
+            "batch_size": batch_size,
+            "max_concurrency": max_concurrency,
+            "batches": len(batches),
+            "retried_items": retried,
+            "failed_items": failed,
+            "wall_ms": round(wall_ms, 2),
+            "sum_batch_ms": round(sum(ordered), 2),
+            "batch_latency_ms": {
+                "p50": round(percentile(ordered, 0.5), 2),
+                "p95": round(percentile(ordered, 0.95), 2),
+                "max": round(ordered[-1], 2)
+            } if ordered else None
+        }
+    }
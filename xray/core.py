@@ -1,12 +1,18 @@
 import time
 import uuid
 from contextlib import contextmanager
-from typing import Any, Callable, Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict, Union
 from datetime import datetime
 
+from . import events
+from .metrics import EXECUTIONS_FAILED, EXECUTIONS_FINISHED, EXECUTIONS_STARTED, STEP_DURATION
+
 class Step:
-    def __init__(self, name: str, step_type: str = "generic", reasoning: str = ""):
+    def __init__(self, name: str, step_type: str = "generic", reasoning: str = "",
+                 execution_id: Optional[str] = None, parent_id: Optional[str] = None):
         self.id = str(uuid.uuid4())
+        self.execution_id = execution_id
+        self.parent_id = parent_id
         self.name = name
         self.step_type = step_type
         self.reasoning = reasoning
@@ -40,12 +46,37 @@ class Step:
         @contextmanager
         def _stream_context():
             stream = EvaluationStream(self.id, buffer_size=buffer_size)
+            stream.execution_id = self.execution_id
             with stream:
                 yield stream
             self.evaluations = stream.get_summary()
         
         return _stream_context()
     
+    def run_batched(self, items, batch_fn: Callable[[List], List], to_evaluation: Callable,
+                    batch_size: int = 10, max_concurrency: int = 4, max_retries: int = 2,
+                    retry_backoff: float = 0.0, buffer_size: int = 100) -> List:
+        """Run batch_fn over items in concurrent batches, streaming one evaluation per item.
+        
+        to_evaluation(item, result) builds each item's evaluation; result is an
+        xray.batching.ItemFailed when every attempt for the item failed.
+        Returns results in item order (None for failed items) and records
+        batch latency and retry counts under metadata["batching"].
+        """
+        from .batching import run_batched
+        
+        with self.evaluation_stream(buffer_size) as stream:
+            def write(item, result, attempts):
+                evaluation = to_evaluation(item, result)
+                if attempts > 1:
+                    evaluation = dict(evaluation, attempts=attempts)
+                stream.write(evaluation)
+            
+            outcome = run_batched(items, batch_fn, batch_size, max_concurrency, max_retries,
+                                  retry_backoff, on_result=write)
+        self.set_metadata(batching=outcome["stats"])
+        return outcome["results"]
+    
     def set_metadata(self, **kwargs):
         self.metadata.update(kwargs)
     
@@ -61,10 +92,20 @@ class Step:
         self.duration_ms = round((time.time() - self._start_time) * 1000, 2)
         if self.status == "running":
             self.status = "success"
+        STEP_DURATION.labels(step_type=self.step_type).observe(self.duration_ms / 1000)
+        events.publish("step_finished", execution_id=self.execution_id, step_id=self.id,
+                       name=self.name, step_type=self.step_type, status=self.status,
+                       duration_ms=self.duration_ms, error=self.error)
+    
+    def _publish_start(self):
+        events.publish("step_started", execution_id=self.execution_id, step_id=self.id,
+                       parent_id=self.parent_id, name=self.name, step_type=self.step_type,
+                       timestamp=self.timestamp_start)
     
     def to_dict(self) -> Dict:
         return {
             "id": self.id,
+            "parent_id": self.parent_id,
             "name": self.name,
             "step_type": self.step_type,
             "reasoning": self.reasoning,
@@ -92,6 +133,9 @@ class XRayExecution:
         self.current_step: Optional[Step] = None
         self.error = None
         self._start_time = time.time()
+        EXECUTIONS_STARTED.inc()
+        events.publish("execution_started", execution_id=self.id, name=self.name,
+                       tags=self.tags, timestamp=self.timestamp_start)
     
     def __enter__(self):
         return self
@@ -101,21 +145,37 @@ class XRayExecution:
         return False 
     
     def step(self, name: str, fn: Optional[Callable] = None, 
-             step_type: str = "generic", reasoning: str = "", **kwargs):
+             step_type: str = "generic", reasoning: Union[str, Callable[[Any], str]] = "",
+             cache=None, metadata: Optional[Dict] = None, **kwargs):
         if fn is not None:
-            return self._auto_step(name, fn, step_type, reasoning, **kwargs)
-        else:
-            return self._manual_step_context(name, step_type, reasoning)
+            return self._auto_step(name, fn, step_type, reasoning, cache=cache, metadata=metadata, **kwargs)
+        if cache is not None:
+            raise ValueError("cache requires the callable form of step()")
+        if callable(reasoning):
+            raise ValueError("reasoning callables require the callable form of step()")
+        return self._manual_step_context(name, step_type, reasoning, metadata)
     
     def _auto_step(self, name: str, fn: Callable, step_type: str, 
-                   reasoning: str, args=(), kwargs=None):
+                   reasoning: Union[str, Callable[[Any], str]], args=(), kwargs=None, cache=None,
+                   metadata: Optional[Dict] = None):
+        """Run fn as a recorded step; a callable reasoning is built from its result"""
         kwargs = kwargs or {}
-        step = Step(name, step_type, reasoning)
+        explain = reasoning if callable(reasoning) else None
+        step = Step(name, step_type, "" if explain else reasoning,
+                    execution_id=self.id, parent_id=self._parent_id())
         step.set_input(args=args, kwargs=kwargs)
+        if metadata:
+            step.set_metadata(**metadata)
+        step._publish_start()
         
         try:
-            result = fn(*args, **kwargs)
+            if cache is None:
+                result = fn(*args, **kwargs)
+            else:
+                result = self._cached_call(step, cache, name, fn, args, kwargs)
             step.set_output(result)
+            if explain is not None:
+                step.set_reasoning(explain(result))
             step.status = "success"
         except Exception as e:
             step.set_error(e)
@@ -126,10 +186,35 @@ class XRayExecution:
         
         return result
     
+    def _cached_call(self, step: Step, cache, name: str, fn: Callable, args, kwargs):
+        """Reuse a cached result for these inputs or compute and store it, recording which in metadata"""
+        key = cache.key(name, args, kwargs)
+        found, result, info = cache.lookup(key)
+        if found:
+            step.set_metadata(cache={"status": "hit", "key": key, "source": info["source"],
+                                     "saved_ms": info["compute_ms"], "cached_at": info["cached_at"]})
+            return result
+        
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        compute_ms = round((time.perf_counter() - started) * 1000, 2)
+        cache.store_result(key, result, compute_ms)
+        step.set_metadata(cache={"status": "miss", "key": key, "saved_ms": 0.0, "compute_ms": compute_ms})
+        return result
+    
+    def _parent_id(self) -> Optional[str]:
+        return self.current_step.id if self.current_step is not None else None
+    
     @contextmanager
-    def _manual_step_context(self, name: str, step_type: str, reasoning: str):
-        step = Step(name, step_type, reasoning)
+    def _manual_step_context(self, name: str, step_type: str, reasoning: str,
+                             metadata: Optional[Dict] = None):
+        # Steps opened inside this one are recorded as its children
+        parent = self.current_step
+        step = Step(name, step_type, reasoning, execution_id=self.id, parent_id=self._parent_id())
+        if metadata:
+            step.set_metadata(**metadata)
         self.current_step = step
+        step._publish_start()
         
         try:
             yield step
@@ -141,7 +226,7 @@ class XRayExecution:
         finally:
             step._finalize()
             self.steps.append(step)
-            self.current_step = None
+            self.current_step = parent
     
     def _finalize(self, exc_type=None, exc_val=None):
         self.timestamp_end = datetime.utcnow().isoformat()
@@ -155,6 +240,12 @@ class XRayExecution:
             }
         else:
             self.status = "completed"
+        
+        EXECUTIONS_FINISHED.labels(status=self.status).inc()
+        if self.status == "failed":
+            EXECUTIONS_FAILED.inc()
+        events.publish("execution_finished", execution_id=self.id, name=self.name,
+                       status=self.status, duration_ms=self.duration_ms, error=self.error)
     
     def to_dict(self) -> Dict:
         return {
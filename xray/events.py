@@ -0,0 +1,85 @@
+import itertools
+import queue
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class Subscription:
+    """A subscriber's bounded event queue; events that do not fit are counted and dropped"""
+    
+    def __init__(self, bus: "EventBus", max_queue: int):
+        self._bus = bus
+        self._queue: "queue.Queue[Dict]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+    
+    def offer(self, event: Dict):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def close(self):
+        self._bus.unsubscribe(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class EventBus:
+    """In-process pub/sub for live execution events.
+    
+    publish() never blocks the instrumented code: it is a no-op without
+    subscribers, and each subscriber gets a bounded queue so a slow reader
+    only loses its own events.
+    """
+    
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+    
+    def subscribe(self, max_queue: Optional[int] = None) -> Subscription:
+        subscription = Subscription(self, max_queue or self.max_queue)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+    
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+    
+    def publish(self, event_type: str, **data):
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        
+        event = dict(data, type=event_type, seq=next(self._sequence), time=time.time())
+        for subscription in subscribers:
+            subscription.offer(event)
+
+
+_event_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    return _event_bus
+
+
+def publish(event_type: str, **data):
+    _event_bus.publish(event_type, **data)
@@ -0,0 +1,257 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationFileRef(NamedTuple):
+    """Queued in place of a streamed step's evaluations; the sender reads the file"""
+    step_id: str
+    path: Path
+
+
+class HTTPExporter:
+    """Ships finished executions to a remote X-Ray API server's /api/ingest endpoint.
+    
+    export() only enqueues and never blocks the pipeline; a background thread
+    packs records into gzip NDJSON batches that are sent when max_batch_records
+    or max_batch_bytes is reached, or flush_interval seconds after the first
+    record of a batch arrived. A single pooled session keeps connections alive.
+    Streamed evaluation files are queued as references and read by the sender
+    in evaluation_chunk_size chunks only as batches go out, so they take one
+    queue slot each. Entries beyond max_queue are dropped and counted.
+    """
+    
+    def __init__(self, url: str, max_batch_records: int = 500, max_batch_bytes: int = 4 * 1024 * 1024,
+                 flush_interval: float = 1.0, max_queue: int = 10000, evaluation_chunk_size: int = 1000,
+                 timeout: float = 10.0, max_retries: int = 3, headers: Optional[Dict] = None):
+        if max_batch_records <= 0 or max_batch_bytes <= 0:
+            raise ValueError("batch limits must be positive")
+        
+        self.url = url
+        self.max_batch_records = max_batch_records
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.evaluation_chunk_size = evaluation_chunk_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.headers.update({"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"})
+        self.session.headers.update(headers or {})
+        self._queue: "deque[Union[bytes, EvaluationFileRef]]" = deque()
+        self._cond = threading.Condition()
+        self._sender: Optional[threading.Thread] = None
+        self._queued_bytes = 0
+        self._in_flight = 0
+        self._streaming = False
+        self._flush_requested = False
+        self._closed = False
+        self.sent_records = 0
+        self.sent_batches = 0
+        self.dropped = 0
+        self.failed = 0
+    
+    def export(self, execution_data: Dict, evaluations_dir: Optional[Path] = None) -> bool:
+        """Queue an execution, preceded by references to any streamed evaluation files found locally"""
+        entries: List[Union[bytes, EvaluationFileRef]] = []
+        if evaluations_dir is not None:
+            for step in execution_data.get("steps", []):
+                evaluations = step.get("evaluations")
+                if isinstance(evaluations, dict) and evaluations.get("mode") == "stream":
+                    entries.append(EvaluationFileRef(step["id"], Path(evaluations_dir) / f"{step['id']}.jsonl"))
+        entries.append(self._line({"type": "execution", "data": execution_data}))
+        return self._enqueue(entries)
+    
+    def export_evaluations(self, step_id: str, evaluations: List[Dict], chunk: int = 0) -> bool:
+        return self._enqueue([self._line({"type": "evaluations", "step_id": step_id,
+                                          "chunk": chunk, "evaluations": evaluations})])
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send everything queued so far; returns False if the timeout expired first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._queue or self._in_flight or self._streaming:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+    
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.session.close()
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "sent_records": self.sent_records,
+                "sent_batches": self.sent_batches,
+                "dropped": self.dropped,
+                "failed": self.failed
+            }
+    
+    def _line(self, record: Dict) -> bytes:
+        return json.dumps(record, separators=(',', ':'), default=str).encode('utf-8') + b"\n"
+    
+    def _evaluation_lines(self, ref: EvaluationFileRef) -> Iterator[bytes]:
+        """Chunk records of a streamed evaluation file, read one chunk at a time"""
+        chunk, evaluations = 0, []
+        try:
+            with open(ref.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        evaluations.append(json.loads(line))
+                    if len(evaluations) >= self.evaluation_chunk_size:
+                        yield self._line({"type": "evaluations", "step_id": ref.step_id,
+                                          "chunk": chunk, "evaluations": evaluations})
+                        chunk, evaluations = chunk + 1, []
+                if evaluations or chunk == 0:
+                    yield self._line({"type": "evaluations", "step_id": ref.step_id,
+                                      "chunk": chunk, "evaluations": evaluations})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Stopped sending evaluations for step {ref.step_id} after {chunk} chunks: {e}")
+    
+    def _enqueue(self, entries: List[Union[bytes, EvaluationFileRef]]) -> bool:
+        with self._cond:
+            if self._closed or len(self._queue) + len(entries) > self.max_queue:
+                self.dropped += len(entries)
+                return False
+            self._queue.extend(entries)
+            self._queued_bytes += sum(len(entry) for entry in entries if isinstance(entry, bytes))
+            if self._sender is None or not self._sender.is_alive():
+                self._sender = threading.Thread(target=self._work, name="xray-exporter", daemon=True)
+                self._sender.start()
+            self._cond.notify_all()
+        return True
+    
+    def _work(self):
+        reading: Optional[Iterator[bytes]] = None
+        carry: Optional[bytes] = None
+        while True:
+            batch, size = [], 0
+            if carry is not None:
+                batch.append(carry)
+                size += len(carry)
+                carry = None
+            
+            # Chunks of the file being sent go out ahead of anything queued after it;
+            # the next chunk is only read once there is room for it in a batch
+            while reading is not None and len(batch) < self.max_batch_records and size < self.max_batch_bytes:
+                line = next(reading, None)
+                if line is None:
+                    reading = None
+                elif batch and size + len(line) > self.max_batch_bytes:
+                    carry = line
+                    break
+                else:
+                    batch.append(line)
+                    size += len(line)
+            
+            if reading is None and carry is None:
+                with self._cond:
+                    self._streaming = False
+                    if not batch:
+                        self._cond.notify_all()
+                        while not self._queue and not self._closed:
+                            self._cond.wait()
+                        if self._closed and not self._queue:
+                            return
+                        
+                        # Linger until the batch is full or the oldest record has waited flush_interval
+                        deadline = time.monotonic() + self.flush_interval
+                        while (len(self._queue) < self.max_batch_records and self._queued_bytes < self.max_batch_bytes
+                               and not isinstance(self._queue[0], EvaluationFileRef)
+                               and not self._closed and not self._flush_requested):
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            self._cond.wait(remaining)
+                    
+                    taken = 0
+                    while self._queue and len(batch) < self.max_batch_records:
+                        entry = self._queue[0]
+                        if isinstance(entry, EvaluationFileRef):
+                            self._queue.popleft()
+                            reading = self._evaluation_lines(entry)
+                            self._streaming = True
+                            break
+                        if batch and size + len(entry) > self.max_batch_bytes:
+                            break
+                        self._queue.popleft()
+                        batch.append(entry)
+                        size += len(entry)
+                        taken += len(entry)
+                    self._queued_bytes -= taken
+                    self._in_flight = len(batch)
+                    if not self._queue and not self._streaming:
+                        self._flush_requested = False
+            
+            if not batch:
+                continue
+            try:
+                self._send(batch)
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+    
+    def _send(self, batch: List[bytes]):
+        body = gzip.compress(b"".join(batch), compresslevel=5)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, data=body, timeout=self.timeout)
+                if response.status_code == 202:
+                    with self._cond:
+                        self.sent_records += len(batch)
+                        self.sent_batches += 1
+                    return
+                if response.status_code not in (429, 503) and response.status_code < 500:
+                    logger.error(f"Ingest rejected batch of {len(batch)} records: {response.text}")
+                    break
+                delay = float(response.headers.get("Retry-After", 2 ** attempt))
+            except requests.RequestException as e:
+                logger.warning(f"Ingest request failed (attempt {attempt + 1}): {e}")
+                delay = 2 ** attempt
+            if attempt < self.max_retries:
+                time.sleep(min(delay, 30))
+        
+        with self._cond:
+            self.failed += len(batch)
+
+
+def exporter_from_env() -> Optional[HTTPExporter]:
+    """Build an exporter from XRAY_INGEST_URL, or None when remote export is off"""
+    url = os.getenv('XRAY_INGEST_URL')
+    if not url:
+        return None
+    
+    headers = {}
+    token = os.getenv('XRAY_INGEST_TOKEN')
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        flush_interval = float(os.getenv('XRAY_EXPORT_FLUSH_MS', '1000')) / 1000
+        max_batch_records = int(os.getenv('XRAY_EXPORT_BATCH_SIZE', '500'))
+    except ValueError:
+        logger.warning("Invalid XRAY_EXPORT_* setting, using exporter defaults")
+        flush_interval, max_batch_records = 1.0, 500
+    return HTTPExporter(url, max_batch_records=max_batch_records, flush_interval=flush_interval, headers=headers)
@@ -0,0 +1,284 @@
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .jobs import QueueFullError
+from .streaming import EvaluationFileWriter
+
+logger = logging.getLogger(__name__)
+
+RECORD_EXECUTION = "execution"
+RECORD_EVALUATIONS = "evaluations"
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$")
+
+
+class IngestError(ValueError):
+    """Raised for malformed ingestion payloads; the whole batch is rejected"""
+
+
+class IngestConflictError(IngestError):
+    """Raised when a batch would overwrite stored executions or evaluation files"""
+
+
+def decode_payload(body: bytes, max_bytes: int) -> bytes:
+    """Gunzip a request body (plain bodies pass through), refusing to inflate past max_bytes.
+    
+    Concatenated gzip members are all decompressed, as gzip itself does.
+    """
+    if body[:2] != b"\x1f\x8b":
+        if len(body) > max_bytes:
+            raise IngestError(f"Payload exceeds {max_bytes} bytes")
+        return body
+    
+    parts = []
+    size = 0
+    remaining = body
+    while remaining:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = decompressor.decompress(remaining, max_bytes - size + 1)
+        except zlib.error as e:
+            raise IngestError(f"Invalid gzip payload: {e}")
+        size += len(data)
+        if size > max_bytes or decompressor.unconsumed_tail:
+            raise IngestError(f"Decompressed payload exceeds {max_bytes} bytes")
+        if not decompressor.eof:
+            raise IngestError("Invalid gzip payload: truncated member")
+        parts.append(data)
+        remaining = decompressor.unused_data
+    return b"".join(parts)
+
+
+def parse_records(payload: bytes) -> List[Dict]:
+    """Parse and validate NDJSON ingestion records.
+    
+    Each line is either {"type": "execution", "data": {...}} or
+    {"type": "evaluations", "step_id": ..., "chunk": n, "evaluations": [...]}.
+    Chunk 0 replaces the step's evaluation file; later chunks append to it.
+    """
+    records = []
+    for line_number, line in enumerate(payload.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise IngestError(f"Line {line_number}: invalid JSON ({e})")
+        if not isinstance(record, dict):
+            raise IngestError(f"Line {line_number}: expected an object")
+        
+        record_type = record.get("type")
+        if record_type == RECORD_EXECUTION:
+            data = record.get("data")
+            if not isinstance(data, dict) or not _SAFE_ID.match(str(data.get("id", ""))):
+                raise IngestError(f"Line {line_number}: execution needs a data object with a valid id")
+            _rewrite_evaluation_files(data, line_number)
+        elif record_type == RECORD_EVALUATIONS:
+            if not _SAFE_ID.match(str(record.get("step_id", ""))):
+                raise IngestError(f"Line {line_number}: evaluations need a valid step_id")
+            if not isinstance(record.get("evaluations"), list):
+                raise IngestError(f"Line {line_number}: evaluations must be a list")
+            if not isinstance(record.get("chunk", 1), int):
+                raise IngestError(f"Line {line_number}: chunk must be an integer")
+        else:
+            raise IngestError(f"Line {line_number}: unknown record type {record_type!r}")
+        records.append(record)
+    return records
+
+
+def _rewrite_evaluation_files(data: Dict, line_number: int):
+    """Point streamed steps at the file their evaluation chunks are written to.
+    
+    The "file" sent by the client is never trusted, since the evaluations
+    endpoints read it on the server.
+    """
+    steps = data.get("steps") or []
+    if not isinstance(steps, list):
+        raise IngestError(f"Line {line_number}: steps must be a list")
+    for step in steps:
+        evaluations = step.get("evaluations") if isinstance(step, dict) else None
+        if not isinstance(evaluations, dict) or evaluations.get("mode") != "stream":
+            continue
+        step_id = str(step.get("id", ""))
+        if not _SAFE_ID.match(step_id):
+            raise IngestError(f"Line {line_number}: streamed step needs a valid id")
+        evaluations["file"] = f"xray_data/evaluations/{step_id}.jsonl"
+
+
+class IngestWriter:
+    """Bounded ingest queue drained by a single bulk-writing thread.
+    
+    Accepted batches are written in arrival order: executions go through the
+    storage backend's bulk save, evaluation chunks are appended to one file
+    per step. A batch that does not fit under max_pending records is rejected
+    with QueueFullError so callers can answer with backpressure.
+    
+    Unless allow_overwrite is set, a batch is rejected with IngestConflictError
+    when it reuses the id of a stored or still queued execution, or starts
+    (chunk 0) an evaluation file that already exists.
+    """
+    
+    def __init__(self, save_many: Callable[[List[Dict]], List[str]], evaluations_dir: Optional[Path],
+                 max_pending: int = 50000, batch_size: int = 1000, name: str = "xray-ingest",
+                 exists: Optional[Callable[[str], bool]] = None, allow_overwrite: bool = False):
+        if max_pending <= 0:
+            raise ValueError("max_pending must be positive")
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        
+        self.save_many = save_many
+        self.evaluations_dir = Path(evaluations_dir) if evaluations_dir is not None else None
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.name = name
+        self.exists = exists
+        self.allow_overwrite = allow_overwrite
+        self._claimed = set()
+        self._queue: "deque[Dict]" = deque()
+        self._cond = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+        self._busy = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.conflicts = 0
+        self.written_executions = 0
+        self.written_evaluations = 0
+        self.failed = 0
+        self.batches = 0
+    
+    def submit(self, records: List[Dict]):
+        if not records:
+            return
+        if self.evaluations_dir is None and any(r["type"] == RECORD_EVALUATIONS for r in records):
+            raise IngestError("This storage backend does not accept evaluation chunks")
+        
+        claims = set() if self.allow_overwrite else {key for key in map(_claim_key, records) if key is not None}
+        stored = [key for key in claims if self._is_stored(key)]
+        
+        with self._cond:
+            taken = stored or [key for key in claims if key in self._claimed]
+            if taken:
+                self.conflicts += len(records)
+                kind, name = sorted(taken)[0]
+                raise IngestConflictError(f"{kind} {name} already exists" +
+                                          (f" (and {len(taken) - 1} more)" if len(taken) > 1 else ""))
+            if len(self._queue) + len(records) > self.max_pending:
+                self.rejected += len(records)
+                raise QueueFullError(f"Ingest queue is full ({self.max_pending} records pending)")
+            self._claimed.update(claims)
+            self._queue.extend(records)
+            self.accepted += len(records)
+            self._start_writer()
+            self._cond.notify()
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything accepted so far has been written"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "pending": len(self._queue) + self._busy,
+                "max_pending": self.max_pending,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "conflicts": self.conflicts,
+                "written_executions": self.written_executions,
+                "written_evaluations": self.written_evaluations,
+                "failed": self.failed,
+                "batches": self.batches
+            }
+    
+    def _is_stored(self, key) -> bool:
+        kind, name = key
+        if kind == RECORD_EXECUTION:
+            return self.exists is not None and self.exists(name)
+        return (self.evaluations_dir / f"{name}.jsonl").exists()
+    
+    def _start_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._work, name=self.name, daemon=True)
+            self._writer.start()
+    
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._busy = len(batch)
+            
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.exception(f"Failed to write ingest batch of {len(batch)} records: {e}")
+                with self._cond:
+                    self.failed += len(batch)
+            finally:
+                with self._cond:
+                    self._claimed.difference_update(map(_claim_key, batch))
+                    self._busy = 0
+                    self.batches += 1
+                    self._cond.notify_all()
+    
+    def _write_batch(self, batch: List[Dict]):
+        executions = []
+        chunks: Dict[str, List[Dict]] = {}
+        for record in batch:
+            if record["type"] == RECORD_EXECUTION:
+                executions.append(record["data"])
+            else:
+                chunks.setdefault(record["step_id"], []).append(record)
+        
+        # Evaluations first, so a visible execution never points at a missing file
+        evaluation_count = sum(self._write_chunks(step_id, records) for step_id, records in chunks.items())
+        if executions:
+            self.save_many(executions)
+        
+        with self._cond:
+            self.written_executions += len(executions)
+            self.written_evaluations += evaluation_count
+    
+    def _write_chunks(self, step_id: str, records: List[Dict]) -> int:
+        self.evaluations_dir.mkdir(parents=True, exist_ok=True)
+        filepath = self.evaluations_dir / f"{step_id}.jsonl"
+        written = 0
+        writer = None
+        try:
+            for record in records:
+                if record.get("chunk") == 0 or writer is None:
+                    if writer is not None:
+                        writer.close()
+                    writer = EvaluationFileWriter(filepath, truncate=record.get("chunk") == 0)
+                writer.write_lines([(json.dumps(evaluation) + '\n').encode('utf-8')
+                                    for evaluation in record["evaluations"]],
+                                   [bool(evaluation.get("qualified", False)) if isinstance(evaluation, dict) else None
+                                    for evaluation in record["evaluations"]])
+                written += len(record["evaluations"])
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+
+def _claim_key(record: Dict):
+    """The execution id or new evaluation file a record would create, or None"""
+    if record["type"] == RECORD_EXECUTION:
+        return RECORD_EXECUTION, record["data"]["id"]
+    if record.get("chunk") == 0:
+        return RECORD_EVALUATIONS, record["step_id"]
+    return None
@@ -0,0 +1,145 @@
+import logging
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    def __init__(self, fn: Callable, args: tuple, kwargs: Dict):
+        self.id = str(uuid.uuid4())
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = JOB_QUEUED
+        self.submitted_at = datetime.utcnow().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+    
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": {"type": type(self.error).__name__, "message": str(self.error)} if self.error else None
+        }
+
+
+class JobQueue:
+    """Bounded worker pool that runs submitted callables as tracked jobs.
+    
+    Submissions beyond max_queue waiting jobs are rejected with QueueFullError
+    instead of spawning more threads. Finished jobs are kept for lookup until
+    max_finished newer jobs have completed.
+    """
+    
+    def __init__(self, max_workers: int = 2, max_queue: int = 16, max_finished: int = 256,
+                 name: str = "xray-job"):
+        if max_workers <= 0:
+            raise ValueError("max_workers must be positive")
+        if max_queue <= 0:
+            raise ValueError("max_queue must be positive")
+        
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.name = name
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = []
+        self.rejected = 0
+    
+    def submit(self, fn: Callable, *args, **kwargs) -> str:
+        job = Job(fn, args, kwargs)
+        with self._lock:
+            self._start_workers()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFullError(f"Job queue is full ({self.max_queue} waiting)")
+            self._jobs[job.id] = job
+        return job.id
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == JOB_RUNNING)
+            return {
+                "workers": self.max_workers,
+                "queued": self._queue.qsize(),
+                "running": running,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected
+            }
+    
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+    
+    def _start_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"{self.name}-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+    
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._run(job)
+    
+    def _run(self, job: Job):
+        job.status = JOB_RUNNING
+        job.started_at = datetime.utcnow().isoformat()
+        try:
+            job.result = job.fn(*job.args, **job.kwargs)
+            job.status = JOB_SUCCEEDED
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed: {e}")
+            job.error = e
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = datetime.utcnow().isoformat()
+            job.fn = job.args = job.kwargs = None
+            job.done.set()
+            with self._lock:
+                self._finished[job.id] = None
+                while len(self._finished) > self.max_finished:
+                    expired, _ = self._finished.popitem(last=False)
+                    self._jobs.pop(expired, None)
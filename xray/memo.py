@@ -0,0 +1,167 @@
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .cache import LRUCache
+from .durability import atomic_write
+from .metrics import STEP_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+
+
+def _canonical(value: Any) -> Any:
+    """JSON-compatible form of a step input with a stable ordering"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    if is_dataclass(value) and not isinstance(value, type):
+        return {"__dataclass__": type(value).__qualname__, "fields": _canonical(asdict(value))}
+    raise TypeError(f"Cannot derive a stable cache key from {type(value).__name__}; pass key_fn to CachePolicy")
+
+
+def stable_key(name: str, args: tuple, kwargs: Dict, version: str = "") -> str:
+    """SHA-256 of the step name, cache version and canonicalized inputs"""
+    payload = json.dumps({"name": name, "version": version, "args": _canonical(args),
+                          "kwargs": _canonical(kwargs)}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCacheStore:
+    """One JSON file per cache key under a directory; values must be JSON-serializable"""
+    
+    def __init__(self, directory: str = "./xray_data/step_cache"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+    
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            record = json.loads(self._path(key).read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable step cache entry {key}: {e}")
+            return None
+        
+        if record.get("expires_at") is not None and record["expires_at"] <= time.time():
+            self.delete(key)
+            return None
+        return record
+    
+    def put(self, key: str, record: Dict):
+        try:
+            content = json.dumps(record).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Step result for {key} is not JSON-serializable, skipping disk cache: {e}")
+            return
+        atomic_write(self._path(key), content)
+    
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+
+class CachePolicy:
+    """Result cache for auto-steps: XRayExecution.step(name, fn, args=..., cache=policy).
+    
+    Results are keyed by a stable hash of the step name, version and inputs
+    (or key_fn(*args, **kwargs)), kept in an in-memory LRU and optionally in a
+    DiskCacheStore. ttl (seconds) bounds the age of a reused result in both.
+    Bump version when the step's code changes to stop reusing old results.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 store: Optional[DiskCacheStore] = None, version: str = "",
+                 key_fn: Optional[Callable[..., Any]] = None):
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.ttl = ttl
+        self.store = store
+        self.version = version
+        self.key_fn = key_fn
+        self._memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+    
+    def key(self, name: str, args: tuple, kwargs: Dict) -> str:
+        if self.key_fn is not None:
+            return stable_key(name, (self.key_fn(*args, **kwargs),), {}, self.version)
+        return stable_key(name, args, kwargs, self.version)
+    
+    def lookup(self, key: str) -> Tuple[bool, Any, Dict]:
+        """Return (found, value, info) where info has the source and the original compute time"""
+        now = time.time()
+        record = self._memory.get(key)
+        source = "memory"
+        if record is not None and record["expires_at"] is not None and record["expires_at"] <= now:
+            self._memory.invalidate(key)
+            record = None
+        
+        if record is None and self.store is not None:
+            record = self.store.get(key)
+            source = "disk"
+            if record is not None:
+                self._memory.put(key, record, record.get("size", 0))
+        
+        if record is None:
+            with self._lock:
+                self.misses += 1
+            STEP_CACHE_LOOKUPS.labels(result=CACHE_MISS).inc()
+            return False, None, {}
+        
+        with self._lock:
+            self.hits += 1
+            self.saved_ms += record["compute_ms"]
+        STEP_CACHE_LOOKUPS.labels(result=CACHE_HIT).inc()
+        return True, copy.deepcopy(record["value"]), {"source": source, "compute_ms": record["compute_ms"],
+                                                      "cached_at": record["cached_at"]}
+    
+    def store_result(self, key: str, value: Any, compute_ms: float):
+        try:
+            size = len(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            size = 0
+        now = time.time()
+        record = {
+            "value": copy.deepcopy(value),
+            "compute_ms": compute_ms,
+            "cached_at": now,
+            "expires_at": now + self.ttl if self.ttl is not None else None,
+            "size": size
+        }
+        self._memory.put(key, record, size)
+        if self.store is not None:
+            self.store.put(key, record)
+    
+    def invalidate(self, key: str):
+        self._memory.invalidate(key)
+        if self.store is not None:
+            self.store.delete(key)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+                "saved_ms": round(self.saved_ms, 2),
+                "memory": self._memory.stats()
+            }
@@ -0,0 +1,244 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+class _Cells:
+    """Per-thread accumulators that are summed when the metric is read.
+    
+    Each thread only ever writes its own cell, so recording takes no lock;
+    the lock is held when a thread touches the metric for the first time and
+    while collecting. Cells of finished threads are folded into a retired
+    total so short-lived request threads do not accumulate.
+    """
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+    
+    def cell(self) -> List[float]:
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._retire_dead()
+                self._cells.append((threading.current_thread(), cell))
+            self._local.cell = cell
+        return cell
+    
+    def totals(self) -> List[float]:
+        with self._lock:
+            self._retire_dead()
+            totals = list(self._retired)
+            for _, cell in self._cells:
+                for i, value in enumerate(cell):
+                    totals[i] += value
+        return totals
+    
+    def _retire_dead(self):
+        alive = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                alive.append((thread, cell))
+            else:
+                for i, value in enumerate(cell):
+                    self._retired[i] += value
+        self._cells = alive
+
+
+class _CounterChild:
+    def __init__(self):
+        self._cells = _Cells(1)
+    
+    def inc(self, amount: float = 1):
+        self._cells.cell()[0] += amount
+    
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        # One slot per bucket, one for +Inf, then sum
+        self._cells = _Cells(len(buckets) + 2)
+    
+    def observe(self, value: float):
+        cell = self._cells.cell()
+        cell[bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+    
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """Cumulative bucket counts (including +Inf), sum and count"""
+        totals = self._cells.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1], running
+
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child(())
+    
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._child(key)
+        return child
+    
+    def _child(self, key: Tuple[str, ...]):
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def _label_text(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+    
+    def _render_child(self, key, child) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally split by labels"""
+    
+    kind = "counter"
+    
+    def _new_child(self):
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1):
+        self._default.inc(amount)
+    
+    def _render_child(self, key, child) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_format(child.value())}"]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values, optionally split by labels"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+    
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self._default.observe(value)
+    
+    def _render_child(self, key, child) -> List[str]:
+        cumulative, total, count = child.snapshot()
+        lines = []
+        for bound, bucket_count in zip(list(self.buckets) + [float("inf")], cumulative):
+            le = "+Inf" if bound == float("inf") else _format(bound)
+            lines.append(f"{self.name}_bucket{self._label_text(key, ('le', le))} {_format(bucket_count)}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {_format(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together in Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+    
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+    
+    def _register(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+    
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+EXECUTIONS_STARTED = REGISTRY.counter("xray_executions_started_total", "Executions started")
+EXECUTIONS_FINISHED = REGISTRY.counter("xray_executions_finished_total", "Executions finished, by final status",
+                                       ["status"])
+EXECUTIONS_FAILED = REGISTRY.counter("xray_executions_failed_total", "Executions that finished with an error")
+STEP_DURATION = REGISTRY.histogram("xray_step_duration_seconds", "Step duration", ["step_type"])
+STEP_CACHE_LOOKUPS = REGISTRY.counter("xray_step_cache_lookups_total", "Cached step lookups, by hit or miss",
+                                      ["result"])
+
+STREAM_WRITES = REGISTRY.counter("xray_stream_writes_total", "Evaluations written to streams", ["backend"])
+STREAM_FLUSHES = REGISTRY.counter("xray_stream_flushes_total", "Evaluation stream buffer flushes", ["backend"])
+STREAM_BYTES = REGISTRY.counter("xray_stream_bytes_total", "Serialized evaluation bytes flushed", ["backend"])
+STREAM_FLUSH_SECONDS = REGISTRY.histogram("xray_stream_flush_seconds", "Evaluation stream flush latency",
+                                          ["backend"], buckets=FAST_BUCKETS)
+
+STORAGE_SECONDS = REGISTRY.histogram("xray_storage_operation_seconds", "Storage operation latency",
+                                     ["backend", "operation"], buckets=FAST_BUCKETS)
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("xray_http_request_duration_seconds", "API request latency",
+                                          ["route", "method", "status"])
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
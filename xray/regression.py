@@ -0,0 +1,92 @@
+from typing import Dict, List, Optional
+
+from .stats import percentile
+from .storage import execution_catalog
+
+
+def compare_to_baseline(target: Dict, baseline: List[Dict], threshold_pct: float = 25.0,
+                        min_baseline: int = 5, min_delta_ms: float = 1.0) -> List[Dict]:
+    """Per-step duration deltas of one catalog entry against baseline entries.
+    
+    Steps are aligned by path. A step is flagged as regressed when its duration
+    is above the baseline p95 and more than threshold_pct (and min_delta_ms)
+    above the baseline p50. Steps with fewer than min_baseline successful
+    baseline samples are reported but never flagged.
+    """
+    samples: Dict[str, List[float]] = {}
+    for entry in baseline:
+        for timing in entry["step_timings"]:
+            if timing.get("status") == "success" and timing.get("duration_ms") is not None:
+                samples.setdefault(timing["path"], []).append(timing["duration_ms"])
+    
+    steps = []
+    for timing in target["step_timings"]:
+        durations = sorted(samples.get(timing["path"], []))
+        duration = timing.get("duration_ms")
+        result = {
+            "path": timing["path"],
+            "name": timing.get("name"),
+            "step_type": timing.get("step_type"),
+            "status": timing.get("status"),
+            "duration_ms": duration,
+            "baseline_samples": len(durations),
+            "baseline_p50_ms": None,
+            "baseline_p95_ms": None,
+            "delta_ms": None,
+            "delta_pct": None,
+            "regressed": False
+        }
+        
+        if durations and duration is not None:
+            p50 = percentile(durations, 0.5)
+            p95 = percentile(durations, 0.95)
+            delta = duration - p50
+            delta_pct = delta / p50 * 100 if p50 > 0 else None
+            result.update(
+                baseline_p50_ms=round(p50, 2),
+                baseline_p95_ms=round(p95, 2),
+                delta_ms=round(delta, 2),
+                delta_pct=round(delta_pct, 2) if delta_pct is not None else None,
+                regressed=(len(durations) >= min_baseline and duration > p95 and delta >= min_delta_ms
+                           and (delta_pct is None or delta_pct > threshold_pct))
+            )
+        steps.append(result)
+    return steps
+
+
+def detect_regressions(name: str, execution_id: Optional[str] = None, window: int = 20,
+                       threshold_pct: float = 25.0, min_baseline: int = 5,
+                       min_delta_ms: float = 1.0) -> Optional[Dict]:
+    """Compare an execution's step durations with the previous runs of the same pipeline.
+    
+    The baseline is the `window` most recent completed executions with the
+    same name that started before the target (the latest execution unless
+    execution_id is given). Works from the storage catalog, so execution files
+    are not reparsed. Returns None if there is no matching execution.
+    """
+    if window < 1:
+        raise ValueError("window must be positive")
+    if threshold_pct < 0:
+        raise ValueError("threshold_pct must be non-negative")
+    
+    entries = execution_catalog(name)
+    if execution_id is None:
+        position = len(entries) - 1
+    else:
+        position = next((i for i, entry in enumerate(entries) if entry["summary"].get("id") == execution_id), -1)
+    if position < 0:
+        return None
+    
+    target = entries[position]
+    baseline = [entry for entry in entries[:position] if entry["summary"].get("status") == "completed"][-window:]
+    steps = compare_to_baseline(target, baseline, threshold_pct, min_baseline, min_delta_ms)
+    
+    return {
+        "name": name,
+        "execution_id": target["summary"].get("id"),
+        "timestamp_start": target["summary"].get("timestamp_start"),
+        "baseline_executions": [entry["summary"].get("id") for entry in baseline],
+        "threshold_pct": threshold_pct,
+        "steps": steps,
+        "regressions": [step["path"] for step in steps if step["regressed"]]
+    }
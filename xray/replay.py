@@ -0,0 +1,222 @@
+import importlib
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .stats import percentile
+from .storage import list_executions, load_execution
+
+MAX_DIFFS = 20
+
+
+class StepRegistry:
+    """Maps recorded step names to the callables that implement them"""
+    
+    def __init__(self):
+        self._steps: Dict[str, Callable] = {}
+    
+    def register(self, name: str, fn: Optional[Callable] = None):
+        """Register fn under name; without fn, returns a decorator"""
+        if fn is None:
+            def decorator(func: Callable) -> Callable:
+                self._steps[name] = func
+                return func
+            return decorator
+        self._steps[name] = fn
+        return fn
+    
+    def register_path(self, name: str, path: str):
+        """Register a callable given as "package.module:function" """
+        module_name, _, attribute = path.partition(":")
+        if not attribute:
+            raise ValueError(f"Expected module:function, got {path}")
+        self._steps[name] = getattr(importlib.import_module(module_name), attribute)
+    
+    def get(self, name: str) -> Optional[Callable]:
+        return self._steps.get(name)
+    
+    def names(self) -> List[str]:
+        return sorted(self._steps)
+
+
+registry = StepRegistry()
+
+
+def register_step(name: str, fn: Optional[Callable] = None):
+    return registry.register(name, fn)
+
+
+def _as_recorded(value: Any) -> Any:
+    """The value as it would read back from storage (tuples become lists, unknown types strings)"""
+    return json.loads(json.dumps(value, default=str))
+
+
+def diff_values(recorded: Any, actual: Any, path: str = "$", limit: int = MAX_DIFFS) -> List[Dict]:
+    """Leaf-level differences between two JSON-like values, up to limit entries"""
+    diffs: List[Dict] = []
+    
+    def walk(a, b, where):
+        if len(diffs) >= limit:
+            return
+        if isinstance(a, dict) and isinstance(b, dict):
+            for key in sorted(set(a) | set(b), key=str):
+                if key not in a:
+                    diffs.append({"path": f"{where}.{key}", "recorded": None, "actual": b[key], "change": "added"})
+                elif key not in b:
+                    diffs.append({"path": f"{where}.{key}", "recorded": a[key], "actual": None, "change": "removed"})
+                else:
+                    walk(a[key], b[key], f"{where}.{key}")
+                if len(diffs) >= limit:
+                    return
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                diffs.append({"path": f"{where}.length", "recorded": len(a), "actual": len(b), "change": "changed"})
+            for i, (x, y) in enumerate(zip(a, b)):
+                walk(x, y, f"{where}[{i}]")
+        elif a != b:
+            diffs.append({"path": where, "recorded": a, "actual": b, "change": "changed"})
+    
+    walk(recorded, actual, path)
+    return diffs
+
+
+def _latency_summary(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "min": round(ordered[0], 4),
+        "p50": round(percentile(ordered, 0.5), 4),
+        "p90": round(percentile(ordered, 0.9), 4),
+        "p99": round(percentile(ordered, 0.99), 4),
+        "max": round(ordered[-1], 4)
+    }
+
+
+def replay_step(step: Dict, fn: Callable, iterations: int = 10, warmup: int = 1) -> Dict:
+    """Call fn with a recorded auto-step's args/kwargs and compare with its recorded output.
+    
+    Latencies are in milliseconds. The output of the last iteration is diffed
+    against the recorded one after the same JSON round trip storage applies;
+    other iterations are only checked for raising.
+    """
+    recorded_input = step.get("input") or {}
+    args = recorded_input.get("args") or []
+    kwargs = recorded_input.get("kwargs") or {}
+    
+    result = {
+        "step_id": step.get("id"),
+        "name": step.get("name"),
+        "recorded_status": step.get("status"),
+        "recorded_duration_ms": step.get("duration_ms"),
+        "iterations": iterations,
+        "errors": 0,
+        "error": None
+    }
+    
+    for _ in range(warmup):
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            break
+    
+    samples = []
+    output = None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        try:
+            output = fn(*args, **kwargs)
+        except Exception as e:
+            result["errors"] += 1
+            result["error"] = {"type": type(e).__name__, "message": str(e)}
+            continue
+        finally:
+            samples.append((time.perf_counter() - started) * 1000)
+    
+    result["latency_ms"] = _latency_summary(samples)
+    if result["errors"] < iterations:
+        diffs = diff_values(step.get("output"), _as_recorded(output))
+        result["output_matches"] = not diffs
+        result["output_diffs"] = diffs
+    else:
+        result["output_matches"] = False
+        result["output_diffs"] = []
+    return result
+
+
+def _is_auto_step(step: Dict) -> bool:
+    recorded_input = step.get("input")
+    return isinstance(recorded_input, dict) and set(recorded_input) == {"args", "kwargs"}
+
+
+def replay_execution(execution: Dict, iterations: int = 10, steps: Optional[List[str]] = None,
+                     step_registry: Optional[StepRegistry] = None, warmup: int = 1) -> Dict:
+    """Replay every registered auto-step of a stored execution (or only the named steps)"""
+    step_registry = step_registry or registry
+    replayed, skipped = [], []
+    for step in execution.get("steps", []):
+        name = step.get("name")
+        if steps is not None and name not in steps:
+            continue
+        fn = step_registry.get(name)
+        if fn is None:
+            skipped.append({"step_id": step.get("id"), "name": name, "reason": "not registered"})
+        elif not _is_auto_step(step):
+            skipped.append({"step_id": step.get("id"), "name": name, "reason": "no recorded args/kwargs"})
+        else:
+            replayed.append(replay_step(step, fn, iterations, warmup))
+    
+    return {
+        "execution_id": execution.get("id"),
+        "name": execution.get("name"),
+        "replayed": replayed,
+        "skipped": skipped
+    }
+
+
+def replay(execution_ids: Optional[List[str]] = None, name: Optional[str] = None, limit: int = 10,
+           iterations: int = 10, steps: Optional[List[str]] = None,
+           step_registry: Optional[StepRegistry] = None, warmup: int = 1) -> Dict:
+    """Replay stored executions and aggregate latency per step name across them.
+    
+    Without execution_ids, the `limit` most recent executions (optionally
+    filtered by pipeline name) are replayed.
+    """
+    if iterations < 1:
+        raise ValueError("iterations must be positive")
+    if execution_ids is None:
+        summaries = [s for s in list_executions() if name is None or s.get("name") == name]
+        execution_ids = [s["id"] for s in summaries[:limit]]
+    
+    executions = [replay_execution(load_execution(execution_id), iterations, steps, step_registry, warmup)
+                  for execution_id in execution_ids]
+    
+    by_step: Dict[str, Dict] = {}
+    for execution in executions:
+        for result in execution["replayed"]:
+            entry = by_step.setdefault(result["name"], {"replays": 0, "mismatches": 0, "errors": 0,
+                                                        "recorded_ms": [], "samples_ms": []})
+            entry["replays"] += 1
+            entry["errors"] += result["errors"]
+            if not result["output_matches"]:
+                entry["mismatches"] += 1
+            if result["recorded_duration_ms"] is not None:
+                entry["recorded_ms"].append(result["recorded_duration_ms"])
+            entry["samples_ms"].append(result["latency_ms"]["p50"])
+    
+    steps_summary = {}
+    for step_name, entry in by_step.items():
+        steps_summary[step_name] = {
+            "replays": entry["replays"],
+            "mismatches": entry["mismatches"],
+            "errors": entry["errors"],
+            "recorded_p50_ms": round(percentile(sorted(entry["recorded_ms"]), 0.5), 4) if entry["recorded_ms"] else None,
+            # Distribution of the per-replay medians across executions
+            "replay_ms": _latency_summary(entry["samples_ms"])
+        }
+    
+    return {
+        "iterations": iterations,
+        "executions": executions,
+        "steps": steps_summary
+    }
@@ -0,0 +1,386 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .cache import LRUCache
+from .durability import _fsync_directory
+from .storage import _evaluation_files, _execution_summary, _step_timings, _stream_step_ids
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentLogStorage:
+    """Append-only storage backend that packs executions into rolling segment files.
+    
+    Each record is a fixed header, a small JSON metadata block (id, summary,
+    streamed step ids) and the compact execution JSON. An in-memory offset
+    index maps execution ids to records; it is built by reading record
+    headers and metadata only. Deletes append a tombstone record.
+    
+    Several processes may share a directory, but only one writes at a time:
+    saves, deletes and compaction hold an exclusive fcntl lock on the LOCK
+    file (a thread lock only, where fcntl is unavailable). Every read first
+    applies records appended to the segment tail since the last scan, and
+    rebuilds the index when another process compacted the segments away.
+    """
+    
+    HEADER = struct.Struct("<BIII")
+    RECORD_PUT = 1
+    RECORD_TOMBSTONE = 2
+    LOCK_FILE = "LOCK"
+    
+    def __init__(self, base_dir: str = "./xray_data/segments", segment_max_bytes: int = 64 * 1024 * 1024,
+                 evaluations_dir: str = "./xray_data/evaluations", cache: Optional[LRUCache] = None):
+        if segment_max_bytes <= 0:
+            raise ValueError("segment_max_bytes must be positive")
+        
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.evaluations_dir = Path(evaluations_dir)
+        self.segment_max_bytes = segment_max_bytes
+        self.cache = cache
+        self._lock = threading.RLock()
+        self._index: Dict[str, Dict] = {}
+        self._ordered_ids: Optional[List[str]] = None
+        self._readers: Dict[int, object] = {}
+        self._scanned: Dict[int, int] = {}
+        self._active_segment = 0
+        self._active_handle = None
+        self._active_size = 0
+        self._last_write = 0.0
+        self._lock_handle = open(self.base_dir / self.LOCK_FILE, 'ab')
+        with self._lock:
+            self._refresh()
+    
+    def save(self, execution_data: Dict, filename: Optional[str] = None) -> str:
+        """Append an execution. filename is accepted for interface compatibility and ignored."""
+        execution_id = execution_data['id']
+        body = json.dumps(execution_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        meta = {
+            "id": execution_id,
+            "summary": _execution_summary(execution_data),
+            "step_ids": _stream_step_ids(execution_data),
+            "step_timings": _step_timings(execution_data)
+        }
+        
+        with self._writing():
+            segment, body_offset = self._append(self.RECORD_PUT, meta, body)
+            self._index[execution_id] = dict(meta, segment=segment, offset=body_offset, length=len(body))
+            self._ordered_ids = None
+            return str(self._segment_path(segment))
+    
+    def save_many(self, executions: List[Dict]) -> List[str]:
+        """Append a batch of executions under one lock with a single flush"""
+        paths = []
+        with self._writing():
+            for execution_data in executions:
+                execution_id = execution_data['id']
+                body = json.dumps(execution_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+                meta = {
+                    "id": execution_id,
+                    "summary": _execution_summary(execution_data),
+                    "step_ids": _stream_step_ids(execution_data),
+                    "step_timings": _step_timings(execution_data)
+                }
+                segment, body_offset = self._append(self.RECORD_PUT, meta, body, flush=False)
+                self._index[execution_id] = dict(meta, segment=segment, offset=body_offset, length=len(body))
+                paths.append(str(self._segment_path(segment)))
+            self._active_handle.flush()
+            self._ordered_ids = None
+        return paths
+    
+    def load(self, execution_id: str) -> Dict:
+        with self._lock:
+            self._refresh()
+            entry = self._index.get(execution_id)
+            if entry is None:
+                raise FileNotFoundError(f"Execution {execution_id} not found")
+            
+            validator = (entry["segment"], entry["offset"])
+            if self.cache is not None:
+                data = self.cache.get(execution_id, validator)
+                if data is not None:
+                    return data
+            
+            body = self._read(entry["segment"], entry["offset"], entry["length"])
+        
+        data = json.loads(body)
+        if self.cache is not None:
+            self.cache.put(execution_id, data, entry["length"], validator)
+        return data
+    
+    def load_raw(self, execution_id: str) -> Tuple[bytes, Optional[str]]:
+        """Stored bytes of an execution; records are uncompressed compact JSON"""
+        with self._lock:
+            self._refresh()
+            entry = self._index.get(execution_id)
+            if entry is None:
+                raise FileNotFoundError(f"Execution {execution_id} not found")
+            return self._read(entry["segment"], entry["offset"], entry["length"]), None
+    
+    def exists(self, execution_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return execution_id in self._index
+    
+    def list_executions(self) -> List[Dict]:
+        with self._lock:
+            self._refresh()
+            return [dict(self._index[execution_id]["summary"]) for execution_id in reversed(self._time_ordered_ids())]
+    
+    def catalog_version(self) -> Optional[Tuple[str, float]]:
+        """Change token for the index: every save or delete appends to the tail segment"""
+        with self._lock:
+            self._refresh()
+            tail = max(self._scanned, default=0)
+            return f"{tail}-{self._scanned.get(tail, 0)}", self._last_write
+    
+    def catalog_entries(self) -> List[Dict]:
+        """Summaries with step timings from the in-memory index"""
+        with self._lock:
+            self._refresh()
+            entries = list(self._index.items())
+        result = []
+        for execution_id, entry in entries:
+            step_timings = entry.get("step_timings")
+            if step_timings is None:
+                # Records appended before step timings were kept in the metadata
+                try:
+                    step_timings = _step_timings(self.load(execution_id))
+                except FileNotFoundError:
+                    continue
+            result.append({"summary": dict(entry["summary"]), "step_timings": step_timings})
+        return result
+    
+    def iter_executions(self, reverse: bool = False) -> Iterator[Dict]:
+        """Yield full executions ordered by timestamp_start (oldest first unless reverse)"""
+        with self._lock:
+            self._refresh()
+            ids = list(self._time_ordered_ids())
+        if reverse:
+            ids.reverse()
+        
+        for execution_id in ids:
+            try:
+                yield self.load(execution_id)
+            except FileNotFoundError:
+                continue
+    
+    def delete(self, execution_id: str):
+        with self._writing():
+            entry = self._index.pop(execution_id, None)
+            if entry is None:
+                return
+            self._append(self.RECORD_TOMBSTONE, {"id": execution_id}, b"")
+            self._ordered_ids = None
+        
+        if self.cache is not None:
+            self.cache.invalidate(execution_id)
+        
+        for step_id in entry["step_ids"]:
+            for evaluation_file in _evaluation_files(self.evaluations_dir, step_id):
+                try:
+                    evaluation_file.unlink()
+                except FileNotFoundError:
+                    pass
+    
+    def compact(self) -> int:
+        """Rewrite live records into fresh segments, dropping overwritten and deleted data.
+        
+        The new segments are fsynced before the old ones are unlinked, so a
+        crash never leaves fewer records on disk than before.
+        Returns the number of bytes reclaimed.
+        """
+        with self._writing():
+            old_segments = sorted(self._scanned)
+            old_bytes = sum(self._scanned.values())
+            
+            self._active_handle.close()
+            self._active_segment = (old_segments[-1] if old_segments else 0) + 1
+            self._active_handle = open(self._segment_path(self._active_segment), 'ab')
+            self._active_size = 0
+            self._scanned[self._active_segment] = 0
+            
+            for execution_id, entry in list(self._index.items()):
+                body = self._read(entry["segment"], entry["offset"], entry["length"])
+                meta = {key: entry[key] for key in ("id", "summary", "step_ids", "step_timings") if key in entry}
+                segment, body_offset = self._append(self.RECORD_PUT, meta, body, flush=False)
+                entry.update(segment=segment, offset=body_offset)
+            self._active_handle.flush()
+            
+            new_segments = [n for n in self._scanned if n not in old_segments]
+            for n in new_segments:
+                with open(self._segment_path(n), 'rb') as f:
+                    os.fsync(f.fileno())
+            _fsync_directory(self.base_dir)
+            
+            for n in old_segments:
+                reader = self._readers.pop(n, None)
+                if reader is not None:
+                    reader.close()
+                self._segment_path(n).unlink()
+                del self._scanned[n]
+            _fsync_directory(self.base_dir)
+            
+            new_bytes = sum(self._scanned.values())
+        
+        if self.cache is not None:
+            self.cache.clear()
+        return old_bytes - new_bytes
+    
+    def close(self):
+        with self._lock:
+            self._close_handles()
+            self._lock_handle.close()
+    
+    def _segment_path(self, number: int) -> Path:
+        return self.base_dir / f"{number:08d}.seg"
+    
+    def _segment_numbers(self) -> List[int]:
+        return sorted(int(path.stem) for path in self.base_dir.glob("*.seg") if path.stem.isdigit())
+    
+    def _time_ordered_ids(self) -> List[str]:
+        if self._ordered_ids is None:
+            self._ordered_ids = sorted(
+                self._index, key=lambda execution_id: self._index[execution_id]["summary"].get("timestamp_start") or ""
+            )
+        return self._ordered_ids
+    
+    @contextmanager
+    def _writing(self):
+        """Hold the thread lock and the cross-process writer lock, caught up with the tail"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_EX)
+            try:
+                # Nobody else can be mid-append now, so a partial tail record is torn
+                self._refresh(truncate_torn=True)
+                tail = max(self._scanned, default=1)
+                if self._active_handle is None or self._active_segment != tail:
+                    if self._active_handle is not None:
+                        self._active_handle.close()
+                    self._active_segment = tail
+                    self._active_handle = open(self._segment_path(tail), 'ab')
+                self._active_size = self._scanned.setdefault(tail, 0)
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_handle.fileno(), fcntl.LOCK_UN)
+    
+    def _append(self, record_type: int, meta: Dict, body: bytes, flush: bool = True):
+        if self._active_size >= self.segment_max_bytes:
+            self._active_handle.close()
+            self._active_segment += 1
+            self._active_handle = open(self._segment_path(self._active_segment), 'ab')
+            self._active_size = 0
+        
+        meta_bytes = json.dumps(meta, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        crc = zlib.crc32(body, zlib.crc32(meta_bytes))
+        header = self.HEADER.pack(record_type, len(meta_bytes), len(body), crc)
+        
+        body_offset = self._active_size + self.HEADER.size + len(meta_bytes)
+        self._active_handle.write(header + meta_bytes + body)
+        if flush:
+            self._active_handle.flush()
+        self._active_size += self.HEADER.size + len(meta_bytes) + len(body)
+        self._scanned[self._active_segment] = self._active_size
+        self._last_write = time.time()
+        return self._active_segment, body_offset
+    
+    def _read(self, segment: int, offset: int, length: int) -> bytes:
+        reader = self._readers.get(segment)
+        if reader is None:
+            reader = open(self._segment_path(segment), 'rb')
+            self._readers[segment] = reader
+        reader.seek(offset)
+        return reader.read(length)
+    
+    def _close_handles(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+        if self._active_handle is not None:
+            self._active_handle.close()
+            self._active_handle = None
+    
+    def _refresh(self, truncate_torn: bool = False):
+        """Apply records appended since the last scan; caller holds the thread lock.
+        
+        Only segments that are new or have grown are read. A missing segment
+        means another process compacted, so the index is rebuilt from scratch.
+        An incomplete record at the tail is left for its writer to finish,
+        unless truncate_torn is set because the writer lock is held.
+        """
+        segments = self._segment_numbers()
+        if any(n not in segments for n in self._scanned):
+            self._index.clear()
+            self._scanned.clear()
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+            if self.cache is not None:
+                self.cache.clear()
+        
+        for number in segments:
+            path = self._segment_path(number)
+            stat = path.stat()
+            scanned = self._scanned.get(number, 0)
+            if number in self._scanned and stat.st_size == scanned:
+                continue
+            
+            valid_size = self._scan(path, number, scanned, verify=number == segments[-1])
+            self._scanned[number] = valid_size
+            self._ordered_ids = None
+            self._last_write = max(self._last_write, stat.st_mtime)
+            if truncate_torn and number == segments[-1] and valid_size < stat.st_size:
+                logger.warning(f"Truncating torn record at offset {valid_size} in {path}")
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_size)
+    
+    def _scan(self, path: Path, number: int, start: int, verify: bool) -> int:
+        """Index the complete records of a segment from start; returns where they end.
+        
+        Bodies are read and checksummed only when verify is set (the tail,
+        which may hold a partial record); sealed segments are skipped through.
+        """
+        valid_size = start
+        with open(path, 'rb') as f:
+            f.seek(start)
+            while True:
+                header = f.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    break
+                record_type, meta_len, body_len, crc = self.HEADER.unpack(header)
+                meta_bytes = f.read(meta_len)
+                if verify:
+                    body = f.read(body_len)
+                    if len(body) < body_len or zlib.crc32(body, zlib.crc32(meta_bytes)) != crc:
+                        break
+                else:
+                    f.seek(body_len, os.SEEK_CUR)
+                
+                try:
+                    meta = json.loads(meta_bytes)
+                except ValueError:
+                    logger.error(f"Corrupt record metadata in {path} at offset {valid_size}")
+                    break
+                
+                body_offset = valid_size + self.HEADER.size + meta_len
+                if record_type == self.RECORD_PUT:
+                    self._index[meta["id"]] = dict(meta, segment=number, offset=body_offset, length=body_len)
+                elif record_type == self.RECORD_TOMBSTONE:
+                    self._index.pop(meta["id"], None)
+                valid_size = body_offset + body_len
+        return valid_size
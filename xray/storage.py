@@ -1,26 +1,186 @@
+import atexit
+import base64
+import bisect
+import gzip
 import json
 import os
 import logging
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import requests
 
+from .cache import LRUCache
+from .exporter import exporter_from_env
+from .metrics import STORAGE_SECONDS
+from .streaming import OUTCOME_INDEX_SUFFIXES, index_path, outcome_index_path
+from .durability import (
+    DURABILITY_GROUP, DURABILITY_NONE, DURABILITY_POLICIES, GroupCommitter, atomic_write, atomic_write_many,
+    cleanup_temp_files
+)
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 
+COMPRESSION_NONE = "none"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_MODES = (COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_ZLIB)
+
+
+def _encode_document(data: Dict, compression: str = COMPRESSION_NONE) -> bytes:
+    if compression == COMPRESSION_NONE:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    content = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if compression == COMPRESSION_GZIP:
+        return gzip.compress(content, mtime=0)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(content)
+    raise ValueError(f"compression must be one of {', '.join(COMPRESSION_MODES)}")
+
+
+def detect_compression(content: bytes) -> Optional[str]:
+    """Compression of a stored document from its magic bytes; JSON text starts with neither"""
+    if content[:2] == b'\x1f\x8b':
+        return COMPRESSION_GZIP
+    if len(content) >= 2 and content[0] == 0x78 and ((content[0] << 8) | content[1]) % 31 == 0:
+        return COMPRESSION_ZLIB
+    return None
+
+
+def _decode_document(content: bytes) -> Dict:
+    compression = detect_compression(content)
+    if compression == COMPRESSION_GZIP:
+        content = gzip.decompress(content)
+    elif compression == COMPRESSION_ZLIB:
+        content = zlib.decompress(content)
+    return json.loads(content)
+
+
+def _execution_summary(data: Dict) -> Dict:
+    return {
+        "id": data.get("id"),
+        "name": data.get("name"),
+        "timestamp_start": data.get("timestamp_start"),
+        "status": data.get("status"),
+        "duration_ms": data.get("duration_ms"),
+        "tags": data.get("tags") or {}
+    }
+
+
+def _evaluation_files(evaluations_dir: Path, step_id: str) -> List[Path]:
+    """A streamed step's evaluation JSONL file and its line-offset indexes"""
+    evaluation_file = evaluations_dir / f"{step_id}.jsonl"
+    return [evaluation_file, index_path(evaluation_file)] + [
+        outcome_index_path(evaluation_file, qualified) for qualified in OUTCOME_INDEX_SUFFIXES]
+
+
+def _stream_step_ids(data: Dict) -> List[str]:
+    """Ids of the steps whose evaluations were written to a stream file"""
+    step_ids = []
+    for step in data.get("steps") or []:
+        evaluations = step.get("evaluations")
+        if isinstance(evaluations, dict) and evaluations.get("mode") == "stream" and step.get("id"):
+            step_ids.append(step["id"])
+    return step_ids
+
+
+def _step_timings(data: Dict) -> List[Dict]:
+    """Per-step durations keyed by a path that lines steps up across runs of the same pipeline.
+    
+    The path joins the names of a step's parents (when steps are nested) and
+    its own name; a repeated path gets an occurrence suffix such as "rank#2".
+    """
+    steps = data.get("steps") or []
+    by_id = {step.get("id"): step for step in steps}
+    occurrences: Dict[str, int] = {}
+    timings = []
+    
+    for step in steps:
+        names = [str(step.get("name"))]
+        parent_id = step.get("parent_id")
+        while parent_id in by_id and len(names) < 32:
+            names.append(str(by_id[parent_id].get("name")))
+            parent_id = by_id[parent_id].get("parent_id")
+        path = "/".join(reversed(names))
+        occurrences[path] = occurrences.get(path, 0) + 1
+        if occurrences[path] > 1:
+            path = f"{path}#{occurrences[path]}"
+        
+        timings.append({
+            "path": path,
+            "name": step.get("name"),
+            "step_type": step.get("step_type"),
+            "duration_ms": step.get("duration_ms"),
+            "status": step.get("status")
+        })
+    return timings
+
+
+class RetentionPolicy:
+    """Limits on how much execution history LocalStorage keeps on disk"""
+    
+    def __init__(self, max_age_days: Optional[float] = None, max_executions: Optional[int] = None,
+                 max_bytes: Optional[int] = None, compact_after_days: Optional[float] = None,
+                 check_interval: float = 60.0):
+        self.max_age_days = max_age_days
+        self.max_executions = max_executions
+        self.max_bytes = max_bytes
+        self.compact_after_days = compact_after_days
+        self.check_interval = check_interval
+    
+    @classmethod
+    def from_env(cls) -> Optional["RetentionPolicy"]:
+        def _env(name, cast):
+            value = os.getenv(name)
+            if value in (None, ""):
+                return None
+            try:
+                return cast(value)
+            except ValueError:
+                logger.warning(f"Ignoring invalid value for {name}: {value!r}")
+                return None
+        
+        policy = cls(
+            max_age_days=_env('XRAY_RETENTION_MAX_AGE_DAYS', float),
+            max_executions=_env('XRAY_RETENTION_MAX_EXECUTIONS', int),
+            max_bytes=_env('XRAY_RETENTION_MAX_BYTES', int),
+            compact_after_days=_env('XRAY_COMPACT_AFTER_DAYS', float),
+            check_interval=_env('XRAY_RETENTION_INTERVAL', float) or 60.0
+        )
+        return policy if policy.is_active() else None
+    
+    def is_active(self) -> bool:
+        return any(limit is not None for limit in (
+            self.max_age_days, self.max_executions, self.max_bytes, self.compact_after_days
+        ))
+
+
 class VercelBlobStorage:
     """Storage backend using Vercel Blob Storage API"""
     
-    def __init__(self, token: str):
+    def __init__(self, token: str, cache: Optional[LRUCache] = None, compression: str = COMPRESSION_NONE):
+        if compression not in COMPRESSION_MODES:
+            raise ValueError(f"compression must be one of {', '.join(COMPRESSION_MODES)}")
+        
         self.token = token
         self.base_url = "https://blob.vercel-storage.com"
+        self.cache = cache
+        self.compression = compression
     
     def save(self, execution_data: Dict, filename: Optional[str] = None) -> str:
         if filename is None:
             filename = f"{execution_data['id']}.json"
         
-        content = json.dumps(execution_data, indent=2, ensure_ascii=False)
+        content = _encode_document(execution_data, self.compression)
         
         response = requests.put(
             f"{self.base_url}/{filename}",
@@ -28,22 +188,52 @@ class VercelBlobStorage:
                 "Authorization": f"Bearer {self.token}",
                 "Content-Type": "application/json"
             },
-            data=content.encode('utf-8')
+            data=content
         )
         
         if response.status_code != 200:
             raise Exception(f"Failed to upload to Vercel Blob: {response.text}")
         
+        if self.cache is not None:
+            self.cache.invalidate(execution_data['id'])
+        
         result = response.json()
         return result.get('url', filename)
     
     def load(self, execution_id: str) -> Dict:
-        filename = f"{execution_id}.json"
+        """Load an execution, revalidating cached copies with a conditional GET.
         
-        response = requests.get(
-            f"{self.base_url}/{filename}",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
+        Cached documents are shared between callers and must not be mutated.
+        """
+        cached = self.cache.peek(execution_id) if self.cache is not None else None
+        etag = cached[1] if cached is not None else None
+        
+        response = self._get_blob(f"{execution_id}.json", etag)
+        
+        if response.status_code == 304:
+            data = self.cache.get(execution_id, etag)
+            if data is not None:
+                return data
+            response = self._get_blob(f"{execution_id}.json")
+        
+        if response.status_code == 404:
+            if self.cache is not None:
+                self.cache.invalidate(execution_id)
+            raise FileNotFoundError(f"Execution {execution_id} not found")
+        
+        if response.status_code != 200:
+            raise Exception(f"Failed to load from Vercel Blob: {response.text}")
+        
+        data = _decode_document(response.content)
+        if self.cache is not None:
+            self.cache.record_miss()
+            if response.headers.get("ETag"):
+                self.cache.put(execution_id, data, len(response.content), response.headers["ETag"])
+        return data
+    
+    def load_raw(self, execution_id: str) -> Tuple[bytes, Optional[str]]:
+        """Stored bytes of an execution and their compression ('gzip', 'zlib' or None)"""
+        response = self._get_blob(f"{execution_id}.json")
         
         if response.status_code == 404:
             raise FileNotFoundError(f"Execution {execution_id} not found")
@@ -51,7 +241,29 @@ class VercelBlobStorage:
         if response.status_code != 200:
             raise Exception(f"Failed to load from Vercel Blob: {response.text}")
         
-        return response.json()
+        return response.content, detect_compression(response.content)
+    
+    def catalog_version(self) -> Optional[Tuple[str, float]]:
+        """Blob listings carry no cheap change token"""
+        return None
+    
+    def _get_blob(self, filename: str, etag: Optional[str] = None):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if etag:
+            headers["If-None-Match"] = etag
+        return requests.get(f"{self.base_url}/{filename}", headers=headers)
+    
+    def catalog_entries(self) -> List[Dict]:
+        """Summaries with step timings; Blob storage has no catalog, so every execution is loaded"""
+        entries = []
+        for summary in self.list_executions():
+            try:
+                data = self.load(summary["id"])
+            except Exception as e:
+                logger.warning(f"Failed to load execution {summary['id']}: {e}")
+                continue
+            entries.append({"summary": summary, "step_timings": _step_timings(data)})
+        return entries
     
     def list_executions(self) -> List[Dict]:
         response = requests.get(
@@ -70,13 +282,7 @@ class VercelBlobStorage:
             if blob['pathname'].endswith('.json'):
                 try:
                     data = self.load(blob['pathname'].replace('.json', ''))
-                    executions.append({
-                        "id": data.get("id"),
-                        "name": data.get("name"),
-                        "timestamp_start": data.get("timestamp_start"),
-                        "status": data.get("status"),
-                        "duration_ms": data.get("duration_ms")
-                    })
+                    executions.append(_execution_summary(data))
                 except Exception as e:
                     logger.warning(f"Failed to load execution metadata for {blob['pathname']}: {e}")
                     continue
@@ -87,70 +293,572 @@ class VercelBlobStorage:
     def delete(self, execution_id: str):
         filename = f"{execution_id}.json"
         
-        response = requests.delete(
-            f"{self.base_url}/{filename}",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
+        try:
+            step_ids = _stream_step_ids(self.load(execution_id))
+        except FileNotFoundError:
+            step_ids = []
+        except Exception as e:
+            logger.warning(f"Failed to read execution {execution_id} before delete: {e}")
+            step_ids = []
+        
+        for blob_name in [f"evaluations/{step_id}.jsonl" for step_id in step_ids] + [filename]:
+            response = requests.delete(
+                f"{self.base_url}/{blob_name}",
+                headers={"Authorization": f"Bearer {self.token}"}
+            )
+            
+            if response.status_code not in (200, 204, 404):
+                logger.warning(f"Failed to delete blob {blob_name}: {response.text}")
         
-        if response.status_code not in (200, 204, 404):
-            logger.warning(f"Failed to delete blob {filename}: {response.text}")
+        if self.cache is not None:
+            self.cache.invalidate(execution_id)
 
 
 class LocalStorage:
     """Local filesystem storage backend"""
     
-    def __init__(self, base_dir: str = "./xray_data"):
+    ARCHIVE_MANIFEST = "manifest.json"
+    ORPHAN_GRACE_SECONDS = 3600
+    
+    def __init__(self, base_dir: str = "./xray_data", retention: Optional[RetentionPolicy] = None,
+                 segment_max_executions: int = 1000, cache: Optional[LRUCache] = None,
+                 durability: str = DURABILITY_NONE, group_commit_window: float = 0.005,
+                 compression: str = COMPRESSION_NONE):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_POLICIES)}")
+        if compression not in COMPRESSION_MODES:
+            raise ValueError(f"compression must be one of {', '.join(COMPRESSION_MODES)}")
+        
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(exist_ok=True)
+        cleanup_temp_files(self.base_dir)
+        self.durability = durability
+        self.compression = compression
+        self._committer = GroupCommitter(group_commit_window) if durability == DURABILITY_GROUP else None
+        self.evaluations_dir = self.base_dir / "evaluations"
+        self.archive_dir = self.base_dir / "archive"
+        self.retention = retention
+        self.segment_max_executions = segment_max_executions
+        self.cache = cache
+        self._archive_lock = threading.Lock()
+        self._archive_index: Dict[str, Path] = {}
+        self._archive_manifests: Dict[Path, Dict] = {}
+        self._archive_index_mtime = None
+        self._retention_lock = threading.Lock()
+        self._last_retention_run = 0.0
+        self._catalog: Dict[Path, tuple] = {}
     
     def save(self, execution_data: Dict, filename: Optional[str] = None) -> str:
         if filename is None:
             filename = f"{execution_data['id']}.json"
         
         filepath = self.base_dir / filename
+        content = _encode_document(execution_data, self.compression)
+        atomic_write(filepath, content, self.durability, self._committer)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(execution_data, f, indent=2, ensure_ascii=False)
-        
+        self._invalidate(execution_data['id'])
+        self._maybe_enforce_retention()
         return str(filepath)
     
+    def save_many(self, executions: List[Dict]) -> List[str]:
+        """Save a batch of executions, syncing the directory once when durability is enabled"""
+        items = [(self.base_dir / f"{data['id']}.json", _encode_document(data, self.compression))
+                 for data in executions]
+        atomic_write_many(items, self.durability)
+        
+        for data in executions:
+            self._invalidate(data['id'])
+        self._maybe_enforce_retention()
+        return [str(filepath) for filepath, _ in items]
+    
     def load(self, execution_id: str) -> Dict:
+        """Load an execution, serving unchanged files from the cache.
+        
+        Cached documents are shared between callers and must not be mutated.
+        """
+        return self._cached_read(execution_id, execution_id, _decode_document)
+    
+    def load_raw(self, execution_id: str) -> Tuple[bytes, Optional[str]]:
+        """Stored bytes of an execution and their compression ('gzip', 'zlib' or None)"""
+        content = self._cached_read(execution_id, (execution_id, "raw"), bytes)
+        return content, detect_compression(content)
+    
+    def exists(self, execution_id: str) -> bool:
+        """Whether an execution is stored live or in an archive segment, without reading it"""
+        return (self.base_dir / f"{execution_id}.json").exists() or execution_id in self._archive_snapshot_index()
+    
+    def _cached_read(self, execution_id: str, cache_key, decode):
         filepath = self.base_dir / f"{execution_id}.json"
         
-        if not filepath.exists():
-            raise FileNotFoundError(f"Execution {execution_id} not found")
+        try:
+            stat = filepath.stat()
+            validator = (stat.st_mtime_ns, stat.st_size)
+            read = filepath.read_bytes
+        except FileNotFoundError:
+            segment = self._archive_snapshot_index().get(execution_id)
+            if segment is None:
+                raise FileNotFoundError(f"Execution {execution_id} not found")
+            stat = segment.stat()
+            validator = (str(segment), stat.st_mtime_ns, stat.st_size)
+            read = lambda: self._read_archived(segment, execution_id)
+        
+        if self.cache is not None:
+            value = self.cache.get(cache_key, validator)
+            if value is not None:
+                return value
+        
+        content = read()
+        value = decode(content)
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        if self.cache is not None:
+            self.cache.put(cache_key, value, len(content), validator)
+        return value
+    
+    def _invalidate(self, execution_id: str):
+        if self.cache is not None:
+            self.cache.invalidate(execution_id)
+            self.cache.invalidate((execution_id, "raw"))
     
     def list_executions(self) -> List[Dict]:
         executions = []
         
         for filepath in self.base_dir.glob("*.json"):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    executions.append({
-                        "id": data.get("id"),
-                        "name": data.get("name"),
-                        "timestamp_start": data.get("timestamp_start"),
-                        "status": data.get("status"),
-                        "duration_ms": data.get("duration_ms")
-                    })
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse execution file {filepath}: {e}")
-                continue
-            except Exception as e:
-                logger.exception(f"Unexpected error reading execution file {filepath}: {e}")
-                continue
+            entry = self._catalog_entry(filepath)
+            if entry is not None:
+                executions.append(dict(entry["summary"]))
         
-        executions.sort(key=lambda x: x.get("timestamp_start", ""), reverse=True)
+        live_ids = {execution["id"] for execution in executions}
+        for manifest in self._archive_snapshot().values():
+            for entry in manifest["executions"]:
+                if entry["summary"].get("id") not in live_ids:
+                    executions.append(dict(entry["summary"]))
+        
+        executions.sort(key=lambda x: x.get("timestamp_start") or "", reverse=True)
         return executions
     
+    def catalog_entries(self) -> List[Dict]:
+        """Summaries with step timings of live and archived executions, from the catalog"""
+        entries = []
+        for filepath in self.base_dir.glob("*.json"):
+            entry = self._catalog_entry(filepath)
+            if entry is not None:
+                entries.append(entry)
+        
+        live_ids = {entry["summary"]["id"] for entry in entries}
+        for manifest in self._archive_snapshot().values():
+            for entry in manifest["executions"]:
+                execution_id = entry["summary"].get("id")
+                if execution_id in live_ids:
+                    continue
+                if "step_timings" not in entry:
+                    # Segments written before step timings were recorded
+                    try:
+                        entry = dict(entry, step_timings=_step_timings(self.load(execution_id)))
+                    except (OSError, ValueError, zlib.error):
+                        continue
+                entries.append(entry)
+        return entries
+    
+    def catalog_version(self) -> Optional[Tuple[str, float]]:
+        """Cheap change token and last-modified time for the set of stored executions.
+        
+        Saves (atomic renames), deletes and compaction all change the mtime of
+        the storage or archive directory, so no file needs to be read.
+        """
+        stats = [self.base_dir.stat()]
+        if self.archive_dir.exists():
+            stats.append(self.archive_dir.stat())
+        token = "-".join(str(stat.st_mtime_ns) for stat in stats)
+        return token, max(stat.st_mtime for stat in stats)
+    
     def delete(self, execution_id: str):
+        self._invalidate(execution_id)
+        
         filepath = self.base_dir / f"{execution_id}.json"
         if filepath.exists():
+            self._delete_evaluations(self._step_ids_for(filepath))
             filepath.unlink()
+            self._catalog.pop(filepath, None)
+        
+        segment = self._archive_snapshot_index().get(execution_id)
+        if segment is not None:
+            self._delete_from_segment(segment, {execution_id})
+    
+    def _catalog_entry(self, filepath: Path) -> Optional[Dict]:
+        """Summary and streamed step ids of an execution file, cached until the file changes"""
+        try:
+            stat = filepath.stat()
+        except FileNotFoundError:
+            return None
+        
+        validator = (stat.st_mtime_ns, stat.st_size)
+        cached = self._catalog.get(filepath)
+        if cached is not None and cached[0] == validator:
+            return cached[1]
+        
+        try:
+            data = _decode_document(filepath.read_bytes())
+            entry = {"summary": _execution_summary(data), "step_ids": _stream_step_ids(data),
+                     "step_timings": _step_timings(data)}
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse execution file {filepath}: {e}")
+            entry = None
+        except Exception as e:
+            logger.exception(f"Unexpected error reading execution file {filepath}: {e}")
+            entry = None
+        
+        self._catalog[filepath] = (validator, entry)
+        return entry
+    
+    def _step_ids_for(self, filepath: Path) -> List[str]:
+        entry = self._catalog_entry(filepath)
+        return entry["step_ids"] if entry is not None else []
+    
+    def _delete_evaluations(self, step_ids: List[str]):
+        for step_id in step_ids:
+            for evaluation_file in _evaluation_files(self.evaluations_dir, step_id):
+                try:
+                    evaluation_file.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to delete evaluation file {evaluation_file}: {e}")
+    
+    def _archive_snapshot(self) -> Dict[Path, Dict]:
+        """Manifests of all archive segments, reloaded when the archive directory changes"""
+        if not self.archive_dir.exists():
+            return {}
+        
+        with self._archive_lock:
+            mtime = self.archive_dir.stat().st_mtime_ns
+            if mtime != self._archive_index_mtime:
+                manifests = {}
+                index = {}
+                for segment in sorted(self.archive_dir.glob("segment-*.zip")):
+                    try:
+                        with zipfile.ZipFile(segment) as archive:
+                            manifest = json.loads(archive.read(self.ARCHIVE_MANIFEST))
+                    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+                        logger.error(f"Failed to read archive segment {segment}: {e}")
+                        continue
+                    manifests[segment] = manifest
+                    for entry in manifest["executions"]:
+                        index[entry["summary"]["id"]] = segment
+                self._archive_manifests = manifests
+                self._archive_index = index
+                self._archive_index_mtime = mtime
+            return dict(self._archive_manifests)
+    
+    def _archive_snapshot_index(self) -> Dict[str, Path]:
+        self._archive_snapshot()
+        return dict(self._archive_index)
+    
+    def _read_archived(self, segment: Path, execution_id: str) -> bytes:
+        try:
+            with zipfile.ZipFile(segment) as archive:
+                return archive.read(f"{execution_id}.json")
+        except (KeyError, zipfile.BadZipFile) as e:
+            logger.error(f"Failed to read execution {execution_id} from {segment}: {e}")
+            raise FileNotFoundError(f"Execution {execution_id} not found") from e
+    
+    def _write_segment(self, segment: Path, members: Dict[str, bytes], entries: List[Dict]):
+        tmp_path = segment.with_suffix(".zip.tmp")
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for execution_id, content in members.items():
+                archive.writestr(f"{execution_id}.json", content)
+            archive.writestr(self.ARCHIVE_MANIFEST, json.dumps({"executions": entries}))
+        os.replace(tmp_path, segment)
+    
+    def _delete_from_segment(self, segment: Path, execution_ids: set):
+        manifest = self._archive_snapshot().get(segment)
+        if manifest is None:
+            return
+        
+        remaining = [e for e in manifest["executions"] if e["summary"]["id"] not in execution_ids]
+        removed = [e for e in manifest["executions"] if e["summary"]["id"] in execution_ids]
+        
+        if remaining:
+            with zipfile.ZipFile(segment) as archive:
+                members = {e["summary"]["id"]: archive.read(f"{e['summary']['id']}.json") for e in remaining}
+            self._write_segment(segment, members, remaining)
+        else:
+            segment.unlink()
+        
+        for entry in removed:
+            self._delete_evaluations(entry["step_ids"])
+    
+    def compact(self, older_than_days: float) -> List[str]:
+        """Roll execution files older than the cutoff into compressed archive segments.
+        
+        Archived executions remain readable through load() and list_executions().
+        Returns the paths of the segments written.
+        """
+        cutoff = time.time() - older_than_days * 86400
+        candidates = []
+        for filepath in self.base_dir.glob("*.json"):
+            try:
+                stat = filepath.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < cutoff:
+                candidates.append((stat.st_mtime, filepath, (stat.st_ino, stat.st_mtime_ns, stat.st_size)))
+        candidates.sort()
+        
+        self.archive_dir.mkdir(exist_ok=True)
+        written = []
+        for offset in range(0, len(candidates), self.segment_max_executions):
+            batch = candidates[offset:offset + self.segment_max_executions]
+            members = {}
+            entries = []
+            for mtime, filepath, _ in batch:
+                try:
+                    content = filepath.read_bytes()
+                    data = _decode_document(content)
+                except (OSError, ValueError, zlib.error) as e:
+                    logger.error(f"Skipping unreadable execution file {filepath} during compaction: {e}")
+                    continue
+                execution_id = data.get("id") or filepath.stem
+                members[execution_id] = content
+                entries.append({
+                    "summary": dict(_execution_summary(data), id=execution_id),
+                    "step_ids": _stream_step_ids(data),
+                    "step_timings": _step_timings(data),
+                    "mtime": mtime
+                })
+            if not members:
+                continue
+            
+            segment = self.archive_dir / f"segment-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.zip"
+            self._write_segment(segment, members, entries)
+            for _, filepath, identity in batch:
+                _remove_if_unchanged(filepath, identity)
+                self._catalog.pop(filepath, None)
+            written.append(str(segment))
+            logger.info(f"Compacted {len(members)} executions into {segment}")
+        
+        return written
+    
+    def _maybe_enforce_retention(self):
+        if self.retention is None:
+            return
+        now = time.time()
+        if now - self._last_retention_run < self.retention.check_interval:
+            return
+        if not self._retention_lock.acquire(blocking=False):
+            return
+        self._last_retention_run = now
+        
+        def _run():
+            try:
+                self._enforce_retention_locked()
+            except Exception as e:
+                logger.exception(f"Retention run failed: {e}")
+            finally:
+                self._retention_lock.release()
+        
+        threading.Thread(target=_run, name="xray-retention", daemon=True).start()
+    
+    def enforce_retention(self, policy: Optional[RetentionPolicy] = None) -> Dict:
+        """Apply age, count and size limits, oldest data first.
+        
+        Runs automatically in the background after saves when the storage has a
+        retention policy; can also be called directly. Returns what was removed.
+        """
+        with self._retention_lock:
+            return self._enforce_retention_locked(policy)
+    
+    def _enforce_retention_locked(self, policy: Optional[RetentionPolicy] = None) -> Dict:
+        policy = policy or self.retention
+        report = {"deleted_executions": 0, "deleted_segments": 0, "deleted_orphans": 0,
+                  "compacted_segments": 0, "bytes_freed": 0}
+        if policy is None:
+            return report
+        
+        if policy.compact_after_days is not None:
+            report["compacted_segments"] = len(self.compact(policy.compact_after_days))
+        
+        units = self._retention_units()
+        now = time.time()
+        
+        def _drop(unit):
+            for path in unit["files"]:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                self._catalog.pop(path, None)
+            units.remove(unit)
+            report["bytes_freed"] += unit["bytes"]
+            report[unit["kind"]] += unit["executions"] if unit["kind"] == "deleted_executions" else 1
+        
+        if policy.max_age_days is not None:
+            cutoff = now - policy.max_age_days * 86400
+            for unit in [u for u in units if u["mtime"] < cutoff]:
+                _drop(unit)
+        
+        if policy.max_executions is not None:
+            total = sum(u["executions"] for u in units)
+            for unit in [u for u in units if u["executions"]]:
+                if total <= policy.max_executions:
+                    break
+                total -= unit["executions"]
+                _drop(unit)
+        
+        if policy.max_bytes is not None:
+            total = sum(u["bytes"] for u in units)
+            for unit in list(units):
+                if total <= policy.max_bytes:
+                    break
+                total -= unit["bytes"]
+                _drop(unit)
+        
+        if any(report[key] for key in ("deleted_executions", "deleted_segments", "deleted_orphans")):
+            logger.info(f"Retention removed {report['deleted_executions']} executions, "
+                        f"{report['deleted_segments']} archive segments and "
+                        f"{report['deleted_orphans']} orphaned evaluation files "
+                        f"({report['bytes_freed']:,} bytes)")
+        return report
+    
+    def _retention_units(self) -> List[Dict]:
+        """Everything retention can delete, oldest first.
+        
+        A unit is a live execution (with its evaluation files), a whole archive
+        segment, or an evaluation file that no stored execution references.
+        """
+        def _size(path: Path) -> int:
+            try:
+                return path.stat().st_size
+            except FileNotFoundError:
+                return 0
+        
+        def _step_files(step_ids):
+            return [path for step_id in step_ids for path in _evaluation_files(self.evaluations_dir, step_id)]
+        
+        units = []
+        referenced = set()
+        
+        for filepath in self.base_dir.glob("*.json"):
+            try:
+                stat = filepath.stat()
+            except FileNotFoundError:
+                continue
+            step_ids = self._step_ids_for(filepath)
+            referenced.update(step_ids)
+            files = [filepath] + _step_files(step_ids)
+            units.append({
+                "kind": "deleted_executions",
+                "mtime": stat.st_mtime,
+                "files": files,
+                "bytes": sum(_size(path) for path in files),
+                "executions": 1
+            })
+        
+        for segment, manifest in self._archive_snapshot().items():
+            step_ids = [step_id for entry in manifest["executions"] for step_id in entry["step_ids"]]
+            referenced.update(step_ids)
+            files = [segment] + _step_files(step_ids)
+            units.append({
+                "kind": "deleted_segments",
+                "mtime": max((entry["mtime"] for entry in manifest["executions"]), default=0),
+                "files": files,
+                "bytes": sum(_size(path) for path in files),
+                "executions": len(manifest["executions"])
+            })
+        
+        # Streams still being written have no saved execution yet, so recent
+        # unreferenced files are left alone.
+        orphan_cutoff = time.time() - self.ORPHAN_GRACE_SECONDS
+        if self.evaluations_dir.exists():
+            for evaluation_file in self.evaluations_dir.glob("*.jsonl"):
+                if evaluation_file.stem in referenced:
+                    continue
+                try:
+                    stat = evaluation_file.stat()
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime > orphan_cutoff:
+                    continue
+                units.append({
+                    "kind": "deleted_orphans",
+                    "mtime": stat.st_mtime,
+                    "files": _evaluation_files(self.evaluations_dir, evaluation_file.stem),
+                    "bytes": stat.st_size,
+                    "executions": 0
+                })
+        
+        units.sort(key=lambda unit: unit["mtime"])
+        return units
+
+
+def _remove_if_unchanged(filepath: Path, identity: Tuple[int, int, int]) -> bool:
+    """Delete a file only if it is still the version identified by (inode, mtime_ns, size).
+    
+    The file is first renamed aside, which atomically claims whatever version
+    is current; if a save replaced it after it was read, that newer version
+    is put back instead of being deleted.
+    """
+    aside = filepath.with_name(f".{filepath.name}.{uuid.uuid4().hex[:8]}.compacting")
+    try:
+        os.rename(filepath, aside)
+    except FileNotFoundError:
+        return False
+    
+    stat = aside.stat()
+    if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != identity:
+        try:
+            # link() never overwrites, so an even newer save in the meantime wins
+            os.link(aside, filepath)
+        except FileExistsError:
+            pass
+        except OSError:
+            # No hard links on this filesystem: restore unless a newer file exists
+            if not filepath.exists():
+                os.replace(aside, filepath)
+        aside.unlink(missing_ok=True)
+        logger.info(f"Kept {filepath.name}: it was saved again during compaction")
+        return False
+    aside.unlink()
+    return True
+
+
+def _cache_from_env() -> Optional[LRUCache]:
+    try:
+        max_entries = int(os.getenv('XRAY_CACHE_MAX_ENTRIES', '256'))
+        max_bytes = int(os.getenv('XRAY_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    except ValueError:
+        logger.warning("Invalid XRAY_CACHE_* setting, using default execution cache size")
+        return LRUCache()
+    
+    if max_entries <= 0 or max_bytes <= 0:
+        return None
+    return LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+
+def _compression_from_env() -> str:
+    compression = os.getenv('XRAY_COMPRESSION', COMPRESSION_NONE)
+    if compression not in COMPRESSION_MODES:
+        logger.warning(f"Unknown XRAY_COMPRESSION {compression!r}, storing uncompressed JSON")
+        return COMPRESSION_NONE
+    return compression
+
+
+def _local_storage_from_env() -> "LocalStorage":
+    durability = os.getenv('XRAY_DURABILITY', DURABILITY_NONE)
+    if durability not in DURABILITY_POLICIES:
+        logger.warning(f"Unknown XRAY_DURABILITY {durability!r}, using '{DURABILITY_NONE}'")
+        durability = DURABILITY_NONE
+    
+    try:
+        window = float(os.getenv('XRAY_GROUP_COMMIT_WINDOW_MS', '5')) / 1000
+    except ValueError:
+        logger.warning("Invalid XRAY_GROUP_COMMIT_WINDOW_MS, using 5ms")
+        window = 0.005
+    
+    return LocalStorage(retention=RetentionPolicy.from_env(), cache=_cache_from_env(),
+                        durability=durability, group_commit_window=window,
+                        compression=_compression_from_env())
 
 
 def _get_storage_backend():
@@ -160,22 +868,217 @@ def _get_storage_backend():
         blob_token = os.getenv('BLOB_READ_WRITE_TOKEN')
         if not blob_token:
             logger.warning("BLOB_READ_WRITE_TOKEN not set, falling back to local storage")
-            return LocalStorage()
-        return VercelBlobStorage(blob_token)
+            return _local_storage_from_env()
+        return VercelBlobStorage(blob_token, cache=_cache_from_env(), compression=_compression_from_env())
+    elif os.getenv('XRAY_STORAGE_BACKEND', 'files') == 'segment':
+        from .segment_log import SegmentLogStorage
+        return SegmentLogStorage(cache=_cache_from_env())
     else:
-        return LocalStorage()
+        return _local_storage_from_env()
 
 
 _default_storage = _get_storage_backend()
 
+_exporter = exporter_from_env()
+if _exporter is not None:
+    atexit.register(_exporter.shutdown)
+
+_backend_name = type(_default_storage).__name__
+_save_seconds = STORAGE_SECONDS.labels(backend=_backend_name, operation="save")
+_save_many_seconds = STORAGE_SECONDS.labels(backend=_backend_name, operation="save_many")
+_load_seconds = STORAGE_SECONDS.labels(backend=_backend_name, operation="load")
+_load_raw_seconds = STORAGE_SECONDS.labels(backend=_backend_name, operation="load_raw")
+_list_seconds = STORAGE_SECONDS.labels(backend=_backend_name, operation="list")
+
+# (catalog token, (timestamp_start, id) keys ascending, summaries in the same order)
+_query_order: Optional[Tuple[str, List[Tuple[str, str]], List[Dict]]] = None
+
+
+@contextmanager
+def _timed(histogram):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
 
 def save_execution(execution_data: Dict, filename: Optional[str] = None) -> str:
-    return _default_storage.save(execution_data, filename)
+    with _timed(_save_seconds):
+        filepath = _default_storage.save(execution_data, filename)
+    if _exporter is not None:
+        _exporter.export(execution_data, evaluations_directory())
+    return filepath
+
+
+def save_executions(executions: List[Dict]) -> List[str]:
+    """Save a batch of executions through the backend's bulk path when it has one"""
+    save_many = getattr(_default_storage, 'save_many', None)
+    with _timed(_save_many_seconds):
+        if save_many is not None:
+            return save_many(executions)
+        return [_default_storage.save(data) for data in executions]
 
 
 def load_execution(execution_id: str) -> Dict:
-    return _default_storage.load(execution_id)
+    with _timed(_load_seconds):
+        return _default_storage.load(execution_id)
+
+
+def load_execution_raw(execution_id: str) -> Tuple[bytes, Optional[str]]:
+    with _timed(_load_raw_seconds):
+        return _default_storage.load_raw(execution_id)
+
+
+def execution_exists(execution_id: str) -> bool:
+    """Whether an execution id is already taken, using the backend's cheap check when it has one"""
+    exists = getattr(_default_storage, 'exists', None)
+    if exists is not None:
+        return exists(execution_id)
+    try:
+        _default_storage.load_raw(execution_id)
+    except FileNotFoundError:
+        return False
+    return True
 
 
 def list_executions() -> List[Dict]:
-    return _default_storage.list_executions()
+    with _timed(_list_seconds):
+        return _default_storage.list_executions()
+
+
+def delete_execution(execution_id: str):
+    _default_storage.delete(execution_id)
+
+
+def execution_catalog(name: Optional[str] = None) -> List[Dict]:
+    """Catalog entries (summary and step_timings), oldest first, optionally for one execution name"""
+    entries = [entry for entry in _default_storage.catalog_entries()
+               if name is None or entry["summary"].get("name") == name]
+    entries.sort(key=lambda entry: (entry["summary"].get("timestamp_start") or "", entry["summary"].get("id") or ""))
+    return entries
+
+
+def execution_cache_stats() -> Optional[Dict]:
+    cache = getattr(_default_storage, 'cache', None)
+    return cache.stats() if cache is not None else None
+
+
+def catalog_version() -> Optional[Tuple[str, float]]:
+    return _default_storage.catalog_version()
+
+
+def evaluations_directory() -> Optional[Path]:
+    """Directory holding streamed evaluation files, or None for remote backends"""
+    return getattr(_default_storage, 'evaluations_dir', None)
+
+
+def evaluation_file(step_id: str, evaluations: Dict) -> Optional[str]:
+    """Where a streamed step's evaluations live, derived from the step id.
+    
+    Local backends never use the stored "file" field, which comes from the
+    client for ingested executions; None if the step id is not a plain name.
+    """
+    directory = evaluations_directory()
+    if directory is None:
+        return evaluations.get("file")
+    if not step_id or Path(step_id).name != step_id or step_id in (".", ".."):
+        return None
+    return str(directory / f"{step_id}.jsonl")
+
+
+def _encode_cursor(summary: Dict) -> str:
+    raw = json.dumps([summary.get("timestamp_start") or "", summary.get("id") or ""])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, execution_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(timestamp), str(execution_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _normalize_timestamp(value: str, field: str) -> str:
+    """Naive UTC ISO timestamp, comparable with stored timestamp_start values"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as e:
+        raise ValueError(f"{field} must be an ISO 8601 timestamp") from e
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def _ordered_summaries() -> Tuple[List[Tuple[str, str]], List[Dict]]:
+    """Execution summaries sorted by (timestamp_start, id), reused while the catalog is unchanged"""
+    global _query_order
+    version = catalog_version()
+    token = version[0] if version is not None else None
+    cached = _query_order
+    if token is not None and cached is not None and cached[0] == token:
+        return cached[1], cached[2]
+    
+    summaries = sorted(list_executions(), key=lambda x: (x.get("timestamp_start") or "", x.get("id") or ""))
+    keys = [(summary.get("timestamp_start") or "", summary.get("id") or "") for summary in summaries]
+    if token is not None:
+        _query_order = (token, keys, summaries)
+    return keys, summaries
+
+
+def _tag_matches(tags: Dict, tag: str) -> bool:
+    key, _, expected = tag.partition(":")
+    if key not in tags:
+        return False
+    if not expected:
+        return True
+    value = tags[key]
+    return expected in (str(value), json.dumps(value))
+
+
+def query_executions(name: Optional[str] = None, status: Optional[str] = None, tag: Optional[str] = None,
+                     since: Optional[str] = None, until: Optional[str] = None,
+                     cursor: Optional[str] = None, limit: int = 50) -> Dict:
+    """Filtered, cursor-paginated execution summaries, newest first.
+    
+    tag is "key" (present) or "key:value"; since/until bound timestamp_start
+    (inclusive/exclusive). Pass the returned next_cursor to get the next page.
+    Raises ValueError for malformed arguments.
+    """
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    since = _normalize_timestamp(since, "since") if since else None
+    until = _normalize_timestamp(until, "until") if until else None
+    after = _decode_cursor(cursor) if cursor else None
+    
+    keys, summaries = _ordered_summaries()
+    # Walk newest first from just below the cursor (or until), stopping once past since
+    start = len(keys)
+    if after is not None:
+        start = bisect.bisect_left(keys, after)
+    if until is not None:
+        start = min(start, bisect.bisect_left(keys, (until,)))
+    
+    page = []
+    has_more = False
+    for position in range(start - 1, -1, -1):
+        summary = summaries[position]
+        if since is not None and keys[position][0] < since:
+            break
+        if name is not None and summary.get("name") != name:
+            continue
+        if status is not None and summary.get("status") != status:
+            continue
+        if tag is not None and not _tag_matches(summary.get("tags") or {}, tag):
+            continue
+        if len(page) == limit:
+            has_more = True
+            break
+        page.append(dict(summary))
+    
+    return {
+        "executions": page,
+        "next_cursor": _encode_cursor(page[-1]) if has_more else None
+    }
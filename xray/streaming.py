@@ -1,14 +1,178 @@
 import json
 import logging
 import os
+import sys
+import time
+from array import array
 from pathlib import Path
-from typing import Dict, List, Iterator, Optional
+from typing import Dict, List, Iterator, Optional, Sequence, Tuple
 from contextlib import contextmanager
 import requests
 
+from . import events
+from .metrics import STREAM_BYTES, STREAM_FLUSHES, STREAM_FLUSH_SECONDS, STREAM_WRITES
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
+INDEX_SUFFIX = ".idx"
+OUTCOME_INDEX_SUFFIXES = {True: ".passed.idx", False: ".failed.idx"}
+
+
+def index_path(filepath) -> Path:
+    """Sidecar line-offset index of an evaluation JSONL file"""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + INDEX_SUFFIX)
+
+
+def outcome_index_path(filepath, qualified: bool) -> Path:
+    """Sidecar offsets of only the passed (or only the failed) lines of an evaluation JSONL file"""
+    filepath = Path(filepath)
+    return filepath.with_name(filepath.name + OUTCOME_INDEX_SUFFIXES[qualified])
+
+
+class EvaluationFileWriter:
+    """Writes evaluation JSONL lines together with their line-offset index.
+    
+    The index holds one little-endian uint64 byte offset per line, so line n
+    starts at offset 8 * n of the index and any page of lines maps to one
+    contiguous byte range of the data file. Two more indexes in the same
+    format hold the offsets of only the passed and only the failed lines, so
+    filtered pages are found without reading the lines before them.
+    """
+    
+    def __init__(self, filepath, truncate: bool = True):
+        self.filepath = Path(filepath)
+        mode = 'wb' if truncate else 'ab'
+        self._data = open(self.filepath, mode)
+        self._index = open(index_path(self.filepath), mode)
+        self._outcomes = {qualified: open(outcome_index_path(self.filepath, qualified), mode)
+                          for qualified in OUTCOME_INDEX_SUFFIXES}
+        self._offset = self._data.tell() if not truncate else 0
+        if not truncate and self._index.tell() // 8 == 0 and self._offset > 0:
+            # Appending to a file that predates its index: index the existing lines first
+            self._index.write(_to_little_endian(_scan_offsets(self.filepath)).tobytes())
+        if not truncate and self._offset > 0 and not any(f.tell() for f in self._outcomes.values()):
+            for qualified, offsets in _scan_outcome_offsets(self.filepath).items():
+                self._outcomes[qualified].write(_to_little_endian(offsets).tobytes())
+    
+    def write_lines(self, lines: List[bytes], qualified: Optional[Sequence[bool]] = None):
+        """Append lines; qualified gives each line's outcome, otherwise it is parsed from the line"""
+        if qualified is None:
+            qualified = [_line_qualified(line) for line in lines]
+        offsets = array('Q')
+        outcomes = {True: array('Q'), False: array('Q')}
+        for line, passed in zip(lines, qualified):
+            offsets.append(self._offset)
+            if passed is not None:
+                outcomes[bool(passed)].append(self._offset)
+            self._offset += len(line)
+        self._data.write(b''.join(lines))
+        self._index.write(_to_little_endian(offsets).tobytes())
+        for outcome, outcome_offsets in outcomes.items():
+            if outcome_offsets:
+                self._outcomes[outcome].write(_to_little_endian(outcome_offsets).tobytes())
+    
+    def close(self):
+        self._data.close()
+        self._index.close()
+        for f in self._outcomes.values():
+            f.close()
+
+
+def _to_little_endian(offsets: array) -> array:
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+def _scan_offsets(filepath: Path) -> array:
+    offsets = array('Q')
+    offset = 0
+    with open(filepath, 'rb') as f:
+        for line in f:
+            offsets.append(offset)
+            offset += len(line)
+    return offsets
+
+
+def _line_qualified(line: bytes) -> Optional[bool]:
+    """A line's qualified flag, or None for lines paging skips (blank or malformed)"""
+    try:
+        evaluation = json.loads(line)
+    except ValueError:
+        return None
+    return bool(evaluation.get("qualified", False)) if isinstance(evaluation, dict) else None
+
+
+def _scan_outcome_offsets(filepath: Path) -> Dict[bool, array]:
+    offsets = {True: array('Q'), False: array('Q')}
+    offset = 0
+    with open(filepath, 'rb') as f:
+        for line in f:
+            qualified = _line_qualified(line) if line.strip() else None
+            if qualified is not None:
+                offsets[qualified].append(offset)
+            offset += len(line)
+    return offsets
+
+
+def outcome_line_offsets(filepath, qualified: bool, start: int, end: int) -> Optional[List[int]]:
+    """Byte offsets of the start..end (exclusive) passed or failed lines via the outcome index.
+    
+    Returns None when the file has no usable outcome index and callers must
+    fall back to scanning.
+    """
+    filepath = Path(filepath)
+    try:
+        data_size = filepath.stat().st_size
+        other_size = outcome_index_path(filepath, not qualified).stat().st_size
+        with open(outcome_index_path(filepath, qualified), 'rb') as f:
+            count = os.fstat(f.fileno()).st_size // 8
+            if data_size > 0 and count + other_size // 8 == 0:
+                return None
+            if start >= count:
+                return []
+            f.seek(start * 8)
+            raw = f.read((min(end, count) - start) * 8)
+    except FileNotFoundError:
+        return None
+    
+    offsets = array('Q')
+    offsets.frombytes(raw[:len(raw) // 8 * 8])
+    offsets = _to_little_endian(offsets)
+    if offsets and offsets[-1] >= data_size:
+        return None
+    return offsets.tolist()
+
+
+def line_byte_range(filepath, start_line: int, end_line: Optional[int] = None) -> Optional[Tuple[int, int, int]]:
+    """Byte range [start, end) covering lines start_line..end_line (exclusive) via the index.
+    
+    Returns (start, end, indexed_lines), or None when the file has no usable
+    index and callers must fall back to scanning.
+    """
+    filepath = Path(filepath)
+    try:
+        data_size = filepath.stat().st_size
+        with open(index_path(filepath), 'rb') as f:
+            indexed_lines = os.fstat(f.fileno()).st_size // 8
+            if indexed_lines == 0:
+                return None
+            
+            def _offset(line: int) -> int:
+                f.seek(line * 8)
+                return int.from_bytes(f.read(8), 'little')
+            
+            if _offset(indexed_lines - 1) >= data_size and data_size > 0:
+                return None
+            start = _offset(start_line) if start_line < indexed_lines else data_size
+            end = _offset(end_line) if end_line is not None and end_line < indexed_lines else data_size
+    except FileNotFoundError:
+        return None
+    
+    return min(start, data_size), min(max(end, start), data_size), indexed_lines
+
 
 class VercelBlobEvaluationStream:
     """Evaluation stream for Vercel Blob Storage"""
@@ -31,6 +195,7 @@ class VercelBlobEvaluationStream:
         self.failed_count = 0
         self._content_lines: List[str] = []
         self._blob_url: Optional[str] = None
+        self.execution_id: Optional[str] = None
     
     def __enter__(self):
         return self
@@ -52,14 +217,26 @@ class VercelBlobEvaluationStream:
         if len(self.buffer) >= self.buffer_size:
             self.flush()
     
+    def write_serialized(self, lines: List[str], qualified: Sequence[bool]):
+        """Write evaluations already serialized as JSON lines (without newlines)"""
+        self.flush()
+        started = time.perf_counter()
+        self._content_lines.extend(lines)
+        _count_serialized(self, len(lines), qualified)
+        _record_flush("vercel", len(lines), sum(map(len, lines)) + len(lines), time.perf_counter() - started)
+        _publish_progress(self)
+    
     def flush(self):
         if not self.buffer:
             return
         
-        for evaluation in self.buffer:
-            self._content_lines.append(json.dumps(evaluation))
+        started = time.perf_counter()
+        lines = [json.dumps(evaluation) for evaluation in self.buffer]
+        self._content_lines.extend(lines)
+        _record_flush("vercel", len(lines), sum(len(line) + 1 for line in lines), time.perf_counter() - started)
         
         self.buffer.clear()
+        _publish_progress(self)
     
     def _upload_to_blob(self):
         """Upload accumulated content to Vercel Blob"""
@@ -105,7 +282,8 @@ class VercelBlobEvaluationStream:
         }
     
     @staticmethod
-    def load_from_file(filepath: str, page: int = 0, page_size: int = 100) -> List[Dict]:
+    def load_from_file(filepath: str, page: int = 0, page_size: int = 100,
+                       qualified: Optional[bool] = None) -> List[Dict]:
         """Load evaluations from Vercel Blob"""
         token = os.getenv('BLOB_READ_WRITE_TOKEN')
         base_url = "https://blob.vercel-storage.com"
@@ -127,6 +305,9 @@ class VercelBlobEvaluationStream:
             start_line = page * page_size
             end_line = start_line + page_size
             
+            if qualified is not None:
+                return _filter_page(lines, start_line, end_line, qualified, filepath)
+            
             evaluations = []
             for i, line in enumerate(lines[start_line:end_line]):
                 try:
@@ -158,20 +339,21 @@ class LocalEvaluationStream:
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.filename = f"{step_id}.jsonl"
         self.filepath = self.output_dir / self.filename
-        self._file_handle = None
+        self._writer: Optional[EvaluationFileWriter] = None
         self.buffer: List[Dict] = []
         self.count = 0
         self.passed_count = 0
         self.failed_count = 0
+        self.execution_id: Optional[str] = None
     
     def __enter__(self):
-        self._file_handle = open(self.filepath, 'w', encoding='utf-8')
+        self._writer = EvaluationFileWriter(self.filepath)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.flush()
-        if self._file_handle:
-            self._file_handle.close()
+        if self._writer:
+            self._writer.close()
         return False
     
     def write(self, evaluation: Dict):
@@ -186,14 +368,27 @@ class LocalEvaluationStream:
         if len(self.buffer) >= self.buffer_size:
             self.flush()
     
+    def write_serialized(self, lines: List[str], qualified: Sequence[bool]):
+        """Write evaluations already serialized as JSON lines (without newlines)"""
+        self.flush()
+        started = time.perf_counter()
+        encoded = [(line + '\n').encode('utf-8') for line in lines]
+        self._writer.write_lines(encoded, qualified)
+        _count_serialized(self, len(lines), qualified)
+        _record_flush("local", len(encoded), sum(map(len, encoded)), time.perf_counter() - started)
+        _publish_progress(self)
+    
     def flush(self):
         if not self.buffer:
             return
         
-        for evaluation in self.buffer:
-            self._file_handle.write(json.dumps(evaluation) + '\n')
+        started = time.perf_counter()
+        lines = [(json.dumps(evaluation) + '\n').encode('utf-8') for evaluation in self.buffer]
+        self._writer.write_lines(lines, [bool(evaluation.get("qualified", False)) for evaluation in self.buffer])
+        _record_flush("local", len(lines), sum(map(len, lines)), time.perf_counter() - started)
         
         self.buffer.clear()
+        _publish_progress(self)
     
     def get_summary(self) -> Dict:
         pass_rate = 0.0
@@ -212,13 +407,48 @@ class LocalEvaluationStream:
         }
     
     @staticmethod
-    def load_from_file(filepath: str, page: int = 0, page_size: int = 100) -> List[Dict]:
+    def load_from_file(filepath: str, page: int = 0, page_size: int = 100,
+                       qualified: Optional[bool] = None) -> List[Dict]:
+        """Read one page of evaluations, optionally counting only passed or failed items.
+        
+        Unfiltered pages are read straight from their byte range when the file
+        has a line-offset index, and filtered pages line by line from the offsets
+        in the passed or failed index; otherwise reading stops as soon as the
+        page is full.
+        """
         evaluations = []
         start_line = page * page_size
         end_line = start_line + page_size
         
+        if qualified is not None:
+            offsets = outcome_line_offsets(filepath, qualified, start_line, end_line)
+            if offsets is not None:
+                return _read_lines_at(filepath, offsets)
+        
+        byte_range = line_byte_range(filepath, start_line, end_line) if qualified is None else None
+        if byte_range is not None:
+            start, end, _ = byte_range
+            try:
+                with open(filepath, 'rb') as f:
+                    f.seek(start)
+                    content = f.read(end - start)
+            except FileNotFoundError:
+                logger.warning(f"Evaluation file not found: {filepath}")
+                return evaluations
+            # A stream still being written may end in a partial line
+            content = content[:content.rfind(b'\n') + 1]
+            for i, line in enumerate(content.splitlines(), start_line):
+                try:
+                    evaluations.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logger.error(f"Failed to parse evaluation at line {i+1} in {filepath}: {e}")
+            return evaluations
+        
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
+                if qualified is not None:
+                    return _filter_page(f, start_line, end_line, qualified, filepath)
+                
                 for i, line in enumerate(f):
                     if i < start_line:
                         continue
@@ -238,6 +468,82 @@ class LocalEvaluationStream:
         return evaluations
 
 
+def _record_flush(backend: str, count: int, size: int, seconds: float):
+    # Writes are counted per flush so that write() itself stays untouched
+    STREAM_WRITES.labels(backend=backend).inc(count)
+    STREAM_FLUSHES.labels(backend=backend).inc()
+    STREAM_BYTES.labels(backend=backend).inc(size)
+    STREAM_FLUSH_SECONDS.labels(backend=backend).observe(seconds)
+
+
+def _count_serialized(stream, count: int, qualified: Sequence[bool]):
+    passed = sum(map(bool, qualified))
+    stream.count += count
+    stream.passed_count += passed
+    stream.failed_count += count - passed
+
+
+def _publish_progress(stream):
+    events.publish("evaluation_progress", execution_id=stream.execution_id, step_id=stream.step_id,
+                   total=stream.count, passed=stream.passed_count, failed=stream.failed_count,
+                   pass_rate=round(stream.passed_count / stream.count * 100, 2) if stream.count else 0.0)
+
+
+def _read_lines_at(filepath: str, offsets: List[int]) -> List[Dict]:
+    evaluations = []
+    try:
+        with open(filepath, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                line = f.readline()
+                # A stream still being written may end in a partial line
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    evaluations.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logger.error(f"Failed to parse evaluation at byte {offset} in {filepath}: {e}")
+    except FileNotFoundError:
+        logger.warning(f"Evaluation file not found: {filepath}")
+    return evaluations
+
+
+def _filter_page(lines, start: int, end: int, qualified: bool, filepath: str) -> List[Dict]:
+    """Items start..end (exclusive) among evaluations whose qualified flag matches"""
+    evaluations = []
+    matched = 0
+    
+    for i, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            evaluation = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse evaluation at line {i+1} in {filepath}: {e}")
+            continue
+        
+        if bool(evaluation.get("qualified", False)) != qualified:
+            continue
+        if matched >= start:
+            evaluations.append(evaluation)
+        matched += 1
+        if matched >= end:
+            break
+    
+    return evaluations
+
+
+def load_evaluations(filepath: str, page: int = 0, page_size: int = 100,
+                     qualified: Optional[bool] = None) -> List[Dict]:
+    """Load a page of streamed evaluations from the backend matching the deployment mode"""
+    deployment_mode = os.getenv('DEPLOYMENT_MODE', 'local')
+    
+    if deployment_mode == 'vercel':
+        return VercelBlobEvaluationStream.load_from_file(filepath, page, page_size, qualified)
+    else:
+        return LocalEvaluationStream.load_from_file(filepath, page, page_size, qualified)
+
+
 def EvaluationStream(step_id: str, buffer_size: int = 100, output_dir: str = "./xray_data/evaluations"):
     """Create an evaluation stream based on deployment mode"""
     deployment_mode = os.getenv('DEPLOYMENT_MODE', 'local')